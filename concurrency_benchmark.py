@@ -0,0 +1,68 @@
+""" Throughput of a tree trained in one thread while other threads make predictions with it.
+
+Each mode runs for the same duration. With 'locked', every call to `partial_fit` and `predict_proba` holds one shared
+lock. With 'lock-free', only the training thread updates the tree, and predictions do not wait for it.
+
+    python concurrency_benchmark.py --readers 4 --batch-size 100 --duration 10
+
+"""
+import argparse
+import threading
+import time
+from contextlib import nullcontext
+
+from skmultiflow.data import RandomTreeGenerator
+
+from hatt import HATT
+
+
+def run(mode, num_readers, batch_size, duration, pretrain_size):
+    stream = RandomTreeGenerator(tree_random_state=0, sample_random_state=0)
+    stream.prepare_for_use()
+    ht = HATT()
+    X, y = stream.next_sample(pretrain_size)
+    ht.partial_fit(X, y, classes=stream.target_values)
+    queries, _ = stream.next_sample(batch_size)
+
+    lock = threading.Lock() if mode == 'locked' else nullcontext()
+    stop = threading.Event()
+    predicted = [0] * num_readers
+
+    def read(reader):
+        while not stop.is_set():
+            with lock:
+                ht.predict_proba(queries)
+            predicted[reader] += batch_size
+
+    readers = [threading.Thread(target=read, args=(reader,)) for reader in range(num_readers)]
+    for reader in readers:
+        reader.start()
+    trained = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        X, y = stream.next_sample()
+        with lock:
+            ht.partial_fit(X, y)
+        trained += 1
+    stop.set()
+    for reader in readers:
+        reader.join()
+    elapsed = time.perf_counter() - start
+    return trained / elapsed, sum(predicted) / elapsed, ht.tree_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--readers', type=int, default=4, help='number of prediction threads')
+    parser.add_argument('--batch-size', type=int, default=100, help='instances per call to predict_proba')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per mode')
+    parser.add_argument('--pretrain-size', type=int, default=5000, help='instances learnt before measuring')
+    args = parser.parse_args()
+    print('{:<10} {:>16} {:>18} {:>14}'.format('mode', 'trained / s', 'predicted / s', 'tree version'))
+    for mode in ('locked', 'lock-free'):
+        trained, predicted, version = run(mode, args.readers, args.batch_size, args.duration, args.pretrain_size)
+        print('{:<10} {:>16.0f} {:>18.0f} {:>14}'.format(mode, trained, predicted, version))
+
+
+if __name__ == '__main__':
+    main()
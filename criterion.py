@@ -0,0 +1,133 @@
+import numpy as np
+
+from skmultiflow.trees.info_gain_split_criterion import InfoGainSplitCriterion
+from skmultiflow.trees.gini_split_criterion import GiniSplitCriterion
+
+
+def entropy(dists):
+    """ Compute the entropy (in bits) of class distributions stored along the last axis.
+
+    Parameters
+    ----------
+    dists: numpy.ndarray of shape (..., n_classes)
+        Class distributions.
+
+    Returns
+    -------
+    numpy.ndarray of shape (...)
+        Entropy of each distribution, 0 for empty distributions.
+
+    """
+    totals = dists.sum(axis=-1)
+    positive = dists > 0.0
+    safe_dists = np.where(positive, dists, 1.0)
+    safe_totals = np.where(totals > 0.0, totals, 1.0)
+    weighted_logs = np.where(positive, dists * np.log2(safe_dists), 0.0).sum(axis=-1)
+    return np.where(totals > 0.0, (totals * np.log2(safe_totals) - weighted_logs) / safe_totals, 0.0)
+
+
+def as_dense_distributions(pre_split_dist, post_split_dist):
+    """ Convert a pre-split distribution and a list of post-split distributions to aligned dense arrays.
+
+    Distributions may be dicts (class index, weight) or NumPy vectors indexed by class.
+
+    Returns
+    -------
+    tuple (numpy.ndarray of shape (n_classes,), numpy.ndarray of shape (n_branches, n_classes))
+
+    """
+    dists = [pre_split_dist] + list(post_split_dist)
+    num_classes = 0
+    for dist in dists:
+        if isinstance(dist, dict):
+            num_classes = max([num_classes] + [int(c) + 1 for c in dist])
+        else:
+            num_classes = max(num_classes, len(dist))
+    dense = np.zeros((len(dists), num_classes))
+    for i, dist in enumerate(dists):
+        if isinstance(dist, dict):
+            for c, weight in dist.items():
+                dense[i, int(c)] = weight
+        else:
+            dense[i, :len(dist)] = dist
+    return dense[0], dense[1:]
+
+
+class VectorizedSplitCriterion(object):
+    """ Split criterion able to score a batch of candidate splits at once.
+
+    Candidates are given as stacked class distributions: `pre_split_dists` has shape (n_candidates, n_classes), or
+    (n_classes,) when all candidates share the same pre-split distribution, and `post_split_dists` has shape
+    (n_candidates, n_branches, n_classes). Class columns must be aligned between both arrays.
+
+    `get_merit_of_split` accepts dense vectors as well as dicts keyed by class index.
+
+    """
+
+    def get_merit_of_split(self, pre_split_dist, post_split_dist):
+        pre_split_dists, post_split_dists = as_dense_distributions(pre_split_dist, post_split_dist)
+        return self.get_merits_of_splits(pre_split_dists, post_split_dists[None])[0]
+
+    def get_merits_of_splits(self, pre_split_dists, post_split_dists):
+        """ Compute the merit of every candidate split.
+
+        Parameters
+        ----------
+        pre_split_dists: numpy.ndarray of shape (n_candidates, n_classes) or (n_classes,)
+            Class distributions before the splits.
+        post_split_dists: numpy.ndarray of shape (n_candidates, n_branches, n_classes)
+            Class distributions of the branches of each split.
+
+        Returns
+        -------
+        numpy.ndarray of shape (n_candidates,)
+            Merit of each candidate.
+
+        """
+        raise NotImplementedError
+
+
+class VectorizedInfoGainSplitCriterion(VectorizedSplitCriterion, InfoGainSplitCriterion):
+    """ Information Gain split criterion with a batched NumPy merit computation.
+
+    The range of merit of a dense distribution depends on the number of classes with a non-zero weight. Ranges are
+    looked up in a table grown with the number of classes.
+
+    """
+
+    def __init__(self, min_branch_frac_option=0.01):
+        super().__init__(min_branch_frac_option)
+        self._ranges_of_merit = [1.0, 1.0, 1.0]
+
+    def get_range_of_merit(self, pre_split_dist):
+        if isinstance(pre_split_dist, dict):
+            num_classes = len(pre_split_dist)
+        else:
+            num_classes = int(np.count_nonzero(pre_split_dist))
+        if num_classes >= len(self._ranges_of_merit):
+            self._ranges_of_merit.extend(np.log2(np.arange(len(self._ranges_of_merit), num_classes + 1)))
+        return self._ranges_of_merit[num_classes]
+
+    def get_merits_of_splits(self, pre_split_dists, post_split_dists):
+        pre_split_dists = np.asarray(pre_split_dists, dtype=float)
+        post_split_dists = np.asarray(post_split_dists, dtype=float)
+        branch_weights = post_split_dists.sum(axis=-1)
+        total_weights = branch_weights.sum(axis=-1)
+        safe_totals = np.where(total_weights > 0.0, total_weights, 1.0)
+        post_entropy = (branch_weights * entropy(post_split_dists)).sum(axis=-1) / safe_totals
+        merits = entropy(pre_split_dists) - post_entropy
+        num_greater = (branch_weights / safe_totals[:, None] > self.min_branch_frac_option).sum(axis=-1)
+        return np.where(num_greater < 2, -np.inf, merits)
+
+
+class VectorizedGiniSplitCriterion(VectorizedSplitCriterion, GiniSplitCriterion):
+    """ Gini split criterion with a batched NumPy merit computation. """
+
+    def get_merits_of_splits(self, pre_split_dists, post_split_dists):
+        post_split_dists = np.asarray(post_split_dists, dtype=float)
+        branch_weights = post_split_dists.sum(axis=-1)
+        total_weights = branch_weights.sum(axis=-1)
+        safe_branch_weights = np.where(branch_weights != 0.0, branch_weights, 1.0)
+        rel_freqs = post_split_dists / safe_branch_weights[..., None]
+        gini = np.where(branch_weights != 0.0, 1.0 - (rel_freqs * rel_freqs).sum(axis=-1), 1.0)
+        return 1.0 - (branch_weights * gini).sum(axis=-1) / total_weights
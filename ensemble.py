@@ -0,0 +1,286 @@
+import copy
+import multiprocessing
+import traceback
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from skmultiflow.core import BaseSKMObject, ClassifierMixin, MetaEstimatorMixin
+from skmultiflow.utils import check_random_state
+from skmultiflow.utils.utils import get_dimensions
+
+from hatt import HATT, output_columns
+
+
+# Commands sent to the member processes
+FIT = 'fit'
+PREDICT_PROBA = 'predict_proba'
+CLOSE = 'close'
+
+
+class ParallelOzaBagging(BaseSKMObject, ClassifierMixin, MetaEstimatorMixin):
+    """ Oza Bagging ensemble of Hoeffding Anytime Trees, each member being trained in its own process.
+
+    As in `skmultiflow.meta.OzaBagging`, each member learns each instance with a weight drawn from a Poisson(1)
+    distribution, multiplied by the sample weight. Members start on the first call to `partial_fit`, in processes that
+    keep their tree. Batches are written once to a shared memory block that the processes read from, and each member
+    draws its own weights. Members only send back their class probabilities, as float32 arrays, and the ensemble
+    averages them.
+
+    The processes run until `close` is called, or the ensemble is used as a context manager.
+
+    Parameters
+    ----------
+    base_estimator: HATT or None (default=None)
+        Each member is a copy of the base estimator. `HATT()` if None.
+    n_estimators: int (default=10)
+        Number of members, and of processes.
+    random_state: int, RandomState instance or None, optional (default=None)
+        If int, random_state is the seed used by the random number generator;
+        If RandomState instance, random_state is the random number generator;
+        If None, the random number generator is the RandomState instance used by `np.random`.
+        Each member draws its weights from a generator seeded by this one.
+
+    Examples
+    --------
+    >>> from skmultiflow.data import RandomTreeGenerator
+    >>> from ensemble import ParallelOzaBagging
+    >>> stream = RandomTreeGenerator(tree_random_state=0, sample_random_state=0)
+    >>> stream.prepare_for_use()
+    >>> with ParallelOzaBagging(n_estimators=8, random_state=1) as ensemble:
+    ...     for _ in range(100):
+    ...         X, y = stream.next_sample(500)
+    ...         y_pred = ensemble.predict(X)
+    ...         ensemble.partial_fit(X, y, classes=stream.target_values)
+
+    """
+
+    def __init__(self, base_estimator=None, n_estimators=10, random_state=None):
+        super().__init__()
+        self.base_estimator = base_estimator
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+        self.classes = None
+        self._class_labels = []
+        self._class_indices = {}
+        # Tuples (process, connection), None until the first call to partial_fit
+        self._members = None
+        self._shared_memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def reset(self):
+        self.close()
+        self.classes = None
+        self._class_labels = []
+        self._class_indices = {}
+        return self
+
+    def close(self):
+        """ Stop the member processes, and release the shared memory. Their trees are lost. """
+        if self._members is not None:
+            for process, connection in self._members:
+                connection.send((CLOSE, None))
+            for process, connection in self._members:
+                process.join()
+                connection.close()
+            self._members = None
+        if self._shared_memory is not None:
+            self._shared_memory.close()
+            self._shared_memory.unlink()
+            self._shared_memory = None
+
+    def partial_fit(self, X, y, classes=None, sample_weight=None):
+        """ Partially (incrementally) fit the members to a batch of instances.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of shape (n_samples, n_features)
+            Instances attributes, converted to floats.
+        y: array_like
+            Instances classes.
+        classes: numpy.ndarray, optional (default=None)
+            Array with all possible/known classes.
+        sample_weight: array-like, optional (default=None)
+            Instances weights, 1 if not provided.
+
+        Returns
+        -------
+        ParallelOzaBagging
+            self
+
+        """
+        if self.classes is None and classes is not None:
+            self.classes = classes
+            for label in classes:
+                self._encode_class(label)
+        row_cnt, _ = get_dimensions(X)
+        if sample_weight is None:
+            sample_weight = np.ones(row_cnt)
+        if row_cnt != len(sample_weight):
+            raise ValueError('Inconsistent number of instances ({}) and weights ({}).'.format(row_cnt,
+                                                                                              len(sample_weight)))
+        y = np.array([self._encode_class(label) for label in np.asarray(y).ravel().tolist()], dtype=np.int64)
+        batch = self._publish_batch(X, y, sample_weight)
+        if self._members is None:
+            # the resource tracker started by the shared memory block is inherited by the member processes, instead
+            # of each starting one that would unlink the blocks it has seen when the member exits
+            self._start_members()
+        self._broadcast(FIT, batch + (len(self._class_labels),))
+        return self
+
+    def predict(self, X):
+        r, _ = get_dimensions(X)
+        if not self._class_labels:
+            return np.zeros(r, dtype=int)
+        y_proba = self.predict_proba(X)
+        _, column_labels = output_columns(self._class_labels)
+        return np.array([column_labels[i] for i in np.argmax(y_proba, axis=1)])
+
+    def predict_proba(self, X):
+        """ Average of the class probabilities predicted by the members.
+
+        Columns follow the label values, as in `HATT.predict_proba`: the column of a non-negative integer label is its
+        value, other labels are sorted.
+
+        """
+        r, _ = get_dimensions(X)
+        num_classes = len(self._class_labels)
+        y_proba = np.zeros((r, max(num_classes, 1)))
+        if self._members is None:
+            return y_proba
+        for member_proba in self._broadcast(PREDICT_PROBA, self._publish_batch(X)):
+            y_proba[:, :member_proba.shape[1]] += member_proba
+        totals = y_proba.sum(axis=1, keepdims=True)
+        y_proba /= np.where(totals != 0, totals, 1.0)
+        if num_classes == 0:
+            return y_proba
+        columns, column_labels = output_columns(self._class_labels[:num_classes])
+        output = np.zeros((r, len(column_labels)))
+        output[:, columns] = y_proba
+        return output
+
+    def _encode_class(self, label):
+        if label not in self._class_indices:
+            self._class_indices[label] = len(self._class_labels)
+            self._class_labels.append(label)
+        return self._class_indices[label]
+
+    def _start_members(self):
+        base_estimator = self.base_estimator if self.base_estimator is not None else HATT()
+        seeds = check_random_state(self.random_state).randint(np.iinfo(np.int32).max, size=self.n_estimators)
+        self._members = []
+        for seed in seeds:
+            connection, member_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_member,
+                                              args=(member_connection, copy.deepcopy(base_estimator), seed),
+                                              daemon=True)
+            process.start()
+            member_connection.close()
+            self._members.append((process, connection))
+
+    def _publish_batch(self, X, y=None, sample_weight=None):
+        """ Write a batch to the shared memory block, replaced by a larger one if needed.
+
+        Returns
+        -------
+        tuple
+            Name of the shared memory block, number of instances and number of attributes, as sent to the members.
+
+        """
+        row_cnt, _ = get_dimensions(X)
+        X = np.asarray(X, dtype=float).reshape(row_cnt, -1)
+        byte_size = batch_byte_size(*X.shape)
+        if self._shared_memory is None or self._shared_memory.size < byte_size:
+            if self._shared_memory is not None:
+                byte_size = max(byte_size, 2 * self._shared_memory.size)
+                # members keep the former block mapped until they read the next batch
+                self._shared_memory.close()
+                self._shared_memory.unlink()
+            self._shared_memory = SharedMemory(create=True, size=byte_size)
+        shared_X, shared_y, shared_weight = batch_views(self._shared_memory.buf, *X.shape)
+        shared_X[:] = X
+        if y is not None:
+            shared_y[:] = y
+            shared_weight[:] = sample_weight
+        return self._shared_memory.name, X.shape[0], X.shape[1]
+
+    def _broadcast(self, command, args):
+        """ Send a command to all the members, and wait for all their results. """
+        for _, connection in self._members:
+            connection.send((command, args))
+        results = [connection.recv() for _, connection in self._members]
+        for result in results:
+            if isinstance(result, MemberError):
+                raise RuntimeError('An ensemble member failed:\n{}'.format(result.message))
+        return results
+
+
+class MemberError(object):
+    """ Traceback of an exception raised in a member process, sent back in place of its result. """
+
+    def __init__(self, message):
+        self.message = message
+
+
+def batch_byte_size(num_rows, num_features):
+    """ Size of a batch in shared memory: float64 attributes, int64 classes and float64 weights. """
+    return max(num_rows * (num_features + 2) * 8, 1)
+
+
+def batch_views(buffer, num_rows, num_features):
+    """ Get the attributes, classes and weights of a batch in a shared memory buffer. """
+    X = np.ndarray((num_rows, num_features), dtype=np.float64, buffer=buffer)
+    y = np.ndarray(num_rows, dtype=np.int64, buffer=buffer, offset=X.nbytes)
+    weight = np.ndarray(num_rows, dtype=np.float64, buffer=buffer, offset=X.nbytes + y.nbytes)
+    return X, y, weight
+
+
+def run_member(connection, tree, seed):
+    """ Serve the commands of an ensemble, in a member process, until it is closed.
+
+    Parameters
+    ----------
+    connection: multiprocessing.connection.Connection
+        Receives commands, and sends back their results.
+    tree: HATT
+        Tree of the member.
+    seed: int
+        Seed of the Poisson weights of the member.
+
+    """
+    random_state = np.random.RandomState(seed)
+    shared_memory = None
+    while True:
+        command, args = connection.recv()
+        if command == CLOSE:
+            break
+        try:
+            name = args[0]
+            if shared_memory is None or shared_memory.name != name:
+                if shared_memory is not None:
+                    shared_memory.close()
+                shared_memory = SharedMemory(name)
+            connection.send(serve_command(tree, random_state, shared_memory.buf, command, args))
+        except Exception:
+            connection.send(MemberError(traceback.format_exc()))
+    if shared_memory is not None:
+        shared_memory.close()
+    connection.close()
+
+
+def serve_command(tree, random_state, buffer, command, args):
+    """ Run a command on the batch in `buffer`, whose views are released on return. """
+    _, num_rows, num_features = args[:3]
+    X, y, weight = batch_views(buffer, num_rows, num_features)
+    if command == FIT:
+        # classes are encoded by the ensemble, the tree gets them in the same order
+        for class_idx in range(args[3]):
+            tree._register_class(class_idx)
+        tree.partial_fit(X, y, sample_weight=weight * random_state.poisson(1.0, num_rows))
+        return None
+    return tree.predict_proba(X).astype(np.float32)
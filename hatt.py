@@ -1,9 +1,30 @@
+import copy
+import heapq
 import logging
-
-from skmultiflow.trees.info_gain_split_criterion import InfoGainSplitCriterion
-from skmultiflow.trees.gini_split_criterion import GiniSplitCriterion
+import math
+import numbers
+import sys
+import textwrap
+import time
+from collections import deque
+
+import numpy as np
+
+from skmultiflow.trees.attribute_split_suggestion import AttributeSplitSuggestion
+from skmultiflow.trees.nominal_attribute_binary_test import NominalAttributeBinaryTest
+from skmultiflow.trees.nominal_attribute_multiway_test import NominalAttributeMultiwayTest
+from skmultiflow.trees.numeric_attribute_binary_test import NumericAttributeBinaryTest
 from skmultiflow.trees import HoeffdingTree
-from operator import attrgetter
+from skmultiflow.rules.base_rule import Rule
+from skmultiflow.utils import check_random_state
+from skmultiflow.utils.utils import get_dimensions
+from operator import itemgetter
+
+from criterion import VectorizedGiniSplitCriterion, VectorizedInfoGainSplitCriterion
+from inference import CompiledTree
+from observers import GaussianObserverStore, HistogramObserverStore, NominalCountObserver
+from replication import ChangeLog
+from snapshot import checkpoint_tree, load_tree, recover_tree, save_tree
 
 
 GINI_SPLIT = 'gini'
@@ -11,6 +32,13 @@ INFO_GAIN_SPLIT = 'info_gain'
 MAJORITY_CLASS = 'mc'
 NAIVE_BAYES = 'nb'
 NAIVE_BAYES_ADAPTIVE = 'nba'
+RANDOM_SUBSPACE = 'random'
+ROTATING_SUBSPACE = 'rotating'
+GAUSSIAN_OBSERVER = 'gaussian'
+HISTOGRAM_OBSERVER = 'histogram'
+
+# Smallest batch predicted through the compiled tree, smaller ones are sorted through the nodes
+COMPILED_TREE_MIN_SAMPLES = 8
 
 # Logger
 logging.basicConfig(format='%(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -24,13 +52,16 @@ class HATT(HoeffdingTree):
     Parameters
     ----------
     max_byte_size: int (default=33554432)
-        Maximum memory consumed by the tree.
+        Maximum memory consumed by the tree. The learning nodes kept by internal nodes are accounted for: when the limit
+        is exceeded, the least promising leaves are deactivated and the least promising internal nodes drop their
+        attribute observers, which stops the re-evaluation of their split.
 
     memory_estimate_period: int (default=1000000)
         Number of instances between memory consumption checks.
 
     grace_period: int (default=200)
-        Number of instances a leaf should observe between split attempts.
+        Number of instances a leaf should observe between split attempts, and minimum number of instances an internal
+        node should observe between re-evaluations of its split.
 
     split_criterion: string (default='info_gain')
         Split criterion to use.
@@ -54,7 +85,8 @@ class HATT(HoeffdingTree):
         If True, disable poor attributes.
 
     no_preprune: boolean (default=False)
-        If True, disable pre-pruning.
+        If True, disable pre-pruning: a leaf splits when its best split beats the second best one by the Hoeffding
+        bound, or when the bound drops below `tie_threshold`, instead of comparing it with not splitting.
 
     leaf_prediction: string (default='nba')
         Prediction mechanism used at leafs.
@@ -69,6 +101,97 @@ class HATT(HoeffdingTree):
     nominal_attributes: list, optional
         List of Nominal attributes. If emtpy, then assume that all attributes are numerical.
 
+    merit_cache_tolerance: float (default=0.1)
+        Relative increase of the weight seen by a node below which the cached split suggestion of an attribute is
+        reused instead of being evaluated again. Nodes are only evaluated again after at least `grace_period` new
+        weight, so 0 disables the reuse, and larger nodes reuse their suggestions for longer, but never once they are
+        `max_reevaluation_period` weight old. Suggestions are compared with the Hoeffding bound of the smallest weight
+        they were evaluated at.
+
+    batch_learning: boolean (default=False)
+        If True, `partial_fit` routes a batch of instances down the tree at once: each node updates its statistics
+        with all the instances that reach it, then checks for a split or a re-evaluation at most once per batch.
+
+    lazy_internal_statistics: boolean (default=False)
+        If True, internal nodes only update their class distribution with the instances that go down to a child. The
+        attribute statistics of an internal node are rebuilt when its split is re-evaluated, by merging the statistics
+        it had when it was split with the ones of all the learning nodes of its subtree. Statistics dropped by the
+        memory management are lost for the parent nodes too, and the adaptive Naive Bayes counters of internal nodes
+        are only updated by the instances that stop at them.
+
+    reevaluation_time_budget: float or None (default=None)
+        If None, the split of an internal node is re-evaluated as soon as it is due, on the path of the instance.
+        Otherwise due re-evaluations are queued, nodes that gained the most weight since their last re-evaluation
+        first, then nodes with the largest last merit gap. Each call to `partial_fit` then spends about this many
+        seconds, after learning its instances, on queued re-evaluations. The remaining ones wait for the next calls,
+        or for `flush`. 0 defers all of them to `flush`.
+
+        Only re-evaluations of internal nodes are deferred: the split attempts of leaves still run on the path of the
+        instance. A re-evaluation is not interrupted, so a call may exceed the budget by one re-evaluation. Nodes are
+        queued when they become due, at most once per `grace_period` of weight, so the queue stays short, and the budget
+        makes no difference, unless re-evaluations become due faster than one of them runs.
+
+    resplit_hysteresis: boolean (default=False)
+        If True, a split is only replaced, by another split or by a leaf, when the best suggestion beats it by more than
+        the Hoeffding bound plus `tie_threshold`. Smaller gaps are ties, which keep the current split. Going back to the
+        attribute the node was split on before its last resplit requires twice this margin. Splits are compared with
+        the merit of the installed threshold, and a better threshold on the same attribute is a resplit too.
+
+    resplit_cooldown: int (default=0)
+        Weight a split node must observe after its creation before its split is re-evaluated.
+
+    max_reevaluation_period: float or None (default=None)
+        Largest weight an internal node observes between two re-evaluations of its split, `10 * grace_period` if None.
+        Without new evidence the wait grows with the weight seen by the node, this cap keeps old nodes re-evaluated
+        often enough to notice a drift.
+
+    numeric_observer: string or callable (default='gaussian')
+        Statistics kept by learning nodes for numeric attributes.
+
+        - 'gaussian' - One Gaussian estimator per attribute and class, candidate splits are evenly spread between the
+          extreme values.
+        - 'histogram' - One histogram of `num_histogram_bins` bins per attribute and class, candidate splits are the
+          bin boundaries. Memory per node does not depend on the observed values.
+        - A callable taking the list of numeric attribute indices, and returning a store with the methods of
+          `GaussianObserverStore`.
+
+    num_histogram_bins: int (default=64)
+        Number of bins of each histogram when `numeric_observer` is 'histogram'.
+
+    reevaluation_subspace: int, float, list or None (default=None)
+        Number of attributes evaluated when the split of an internal node is re-evaluated, None for all of them. A float
+        in (0, 1) is a fraction of the observed attributes, rounded up. A list gives the number for each depth, the root
+        being at depth 0, and its last entry applies to deeper nodes. The attribute of the current split is always
+        evaluated and counts towards the number. Numbers must be positive, and no larger than the number of attributes
+        of the first instances learnt.
+
+    reevaluation_subspace_sampling: string (default='random')
+        How the other attributes of a re-evaluation are chosen when `reevaluation_subspace` is set.
+
+        - 'random' - A new random subset at each re-evaluation
+        - 'rotating' - The next attributes in index order, so that all of them are evaluated in turn
+
+    observer_min_weight: float (default=0)
+        Weight a new leaf must observe, on top of the class distribution it starts with, before it creates its
+        attribute observers. Until then it only updates its class distribution: it cannot split, and its Naive Bayes
+        votes are its class distribution. With `lazy_internal_statistics`, the instances it saw before creating its
+        observers are missing from the statistics rebuilt for its ancestors.
+
+    idle_horizon: float or None (default=None)
+        If not None, the tree is checked every `idle_horizon` training weight for nodes that no instance reached during
+        the last `idle_horizon` weight. Such subtrees, and such active leaves, are collapsed into inactive leaves that
+        only keep their class distribution, and become active leaves again when an instance reaches them.
+
+    statistics_dtype: string or numpy.dtype (default='float64')
+        Floating point type of the class distributions and attribute statistics stored by the nodes. 'float32' halves
+        the size of these arrays. Split merits, bounds and Naive Bayes votes are still computed in double precision,
+        but float32 weights stop counting unit increments beyond 2**24 per class and node.
+
+    random_state: int, RandomState instance or None (default=None)
+        If int, random_state is the seed used by the random number generator;
+        If RandomState instance, random_state is the random number generator;
+        If None, the random number generator is the RandomState instance used by `np.random`.
+
     Notes
     -----
     The Hoeffding Adaptive Tree [1]_ uses ADWIN [2]_ to monitor performance of branches on the tree and to replace them
@@ -126,154 +249,1276 @@ class HATT(HoeffdingTree):
                  no_preprune=False,
                  leaf_prediction='nba',
                  nb_threshold=0,
-                 nominal_attributes=None):
+                 nominal_attributes=None,
+                 merit_cache_tolerance=0.1,
+                 batch_learning=False,
+                 lazy_internal_statistics=False,
+                 reevaluation_time_budget=None,
+                 resplit_hysteresis=False,
+                 resplit_cooldown=0,
+                 max_reevaluation_period=None,
+                 numeric_observer='gaussian',
+                 num_histogram_bins=64,
+                 reevaluation_subspace=None,
+                 reevaluation_subspace_sampling='random',
+                 observer_min_weight=0,
+                 idle_horizon=None,
+                 statistics_dtype='float64',
+                 random_state=None):
         super().__init__(max_byte_size, memory_estimate_period, grace_period,
          split_criterion, split_confidence, tie_threshold, binary_split,
           stop_mem_management, remove_poor_atts, no_preprune, leaf_prediction,
           nb_threshold, nominal_attributes)
+        self.merit_cache_tolerance = merit_cache_tolerance
+        self.batch_learning = batch_learning
+        self.lazy_internal_statistics = lazy_internal_statistics
+        self.reevaluation_time_budget = reevaluation_time_budget
+        self.resplit_hysteresis = resplit_hysteresis
+        self.resplit_cooldown = resplit_cooldown
+        self.max_reevaluation_period = max_reevaluation_period
+        self.num_histogram_bins = num_histogram_bins
+        self.numeric_observer = numeric_observer
+        self.reevaluation_subspace = reevaluation_subspace
+        self._check_reevaluation_subspace()
+        self.reevaluation_subspace_sampling = reevaluation_subspace_sampling
+        self.observer_min_weight = observer_min_weight
+        self.idle_horizon = idle_horizon
+        self.statistics_dtype = statistics_dtype
+        self._statistics_dtype = np.dtype(statistics_dtype)
+        if not np.issubdtype(self._statistics_dtype, np.floating):
+            raise ValueError('statistics_dtype must be a floating point type, got {}'.format(statistics_dtype))
+        self.random_state = random_state
+        self._random_state = check_random_state(random_state)
+        # Heap of tuples (priority, sequence number, split node, parent, parent branch)
+        self._reevaluation_queue = []
+        self._reevaluation_sequence = 0
         self.number_of_splits = 0
         self.number_of_resplits = 0
         self.number_of_unsplits = 0
+        # Re-evaluations at which resplit_hysteresis kept a split, and number of nodes a replacement would have discarded
+        self.number_of_rebuilds_avoided = 0
+        self.rebuild_nodes_avoided = 0
+        # Idle subtrees and leaves collapsed by idle_horizon, and number of nodes they held
+        self.number_of_collapses = 0
+        self.collapsed_nodes = 0
+        self._class_labels = []
+        self._class_indices = {}
+        # Tuple (number of classes, column of each class index, label of each column), see _output_columns
+        self._output_layout = None
+        self._compiled_tree = None
+        # Number of structural changes, see tree_version
+        self._tree_version = 0
+        self._internal_node_byte_size_estimate = 0.0
+        self._splits_at_last_estimate = 0
+        # Nodes get a node_id when they enter the tree
+        self._next_node_id = 0
+        # Nodes updated since the last checkpoint by node_id, None until the first checkpoint
+        self._dirty_nodes = None
+        self._checkpoint = None
+        self._change_log = None
+
+
+    # Override HoeffdingTree
+    @HoeffdingTree.split_criterion.setter
+    def split_criterion(self, split_criterion):
+        HoeffdingTree.split_criterion.fset(self, split_criterion)
+        if self._split_criterion == GINI_SPLIT:
+            self._criterion = VectorizedGiniSplitCriterion()
+        else:
+            self._criterion = VectorizedInfoGainSplitCriterion()
+
+    # Override HoeffdingTree
+    @HoeffdingTree.split_confidence.setter
+    def split_confidence(self, split_confidence):
+        HoeffdingTree.split_confidence.fset(self, split_confidence)
+        # Hoeffding bound of a merit range R after n observations: R * sqrt(factor / n)
+        self._hoeffding_bound_factor = math.log(1.0 / split_confidence) / 2.0
+
+    @property
+    def numeric_observer(self):
+        return self._numeric_observer
+
+    @numeric_observer.setter
+    def numeric_observer(self, numeric_observer):
+        if numeric_observer not in (GAUSSIAN_OBSERVER, HISTOGRAM_OBSERVER) and not callable(numeric_observer):
+            logger.info("Invalid numeric_observer option '{}', will use default '{}'".format(numeric_observer,
+                                                                                          GAUSSIAN_OBSERVER))
+            numeric_observer = GAUSSIAN_OBSERVER
+        self._numeric_observer = numeric_observer
+
+    def _new_numeric_observers(self, att_indices):
+        """ Create the store observing the numeric attributes of a learning node. """
+        if self._numeric_observer == GAUSSIAN_OBSERVER:
+            return GaussianObserverStore(att_indices, dtype=self._statistics_dtype)
+        if self._numeric_observer == HISTOGRAM_OBSERVER:
+            return HistogramObserverStore(att_indices, self.num_histogram_bins, self._statistics_dtype)
+        return self._numeric_observer(att_indices)
+
+    def _hoeffding_bound(self, merit_range, weight_seen):
+        """ Same as `compute_hoeffding_bound` with `split_confidence`, the logarithm being computed once. """
+        return merit_range * math.sqrt(self._hoeffding_bound_factor / weight_seen)
+
+    def _max_reevaluation_wait(self):
+        """ Largest weight between two re-evaluations of a split, see `max_reevaluation_period`. """
+        if self.max_reevaluation_period is None:
+            return 10 * self.grace_period
+        return self.max_reevaluation_period
+
+
+    class HattActiveLearningNode(HoeffdingTree.ActiveLearningNode):
+        """ Learning node with array-backed numeric observers and a cache of split suggestions.
+
+        Numeric attributes are observed by a single store, a `GaussianObserverStore` by default, nominal attributes
+        keep one `NominalCountObserver` each. Observers are created on the first observed instance.
+
+        Classes are identified by their index in the tree's label encoder, and the observed class distribution is a
+        NumPy vector indexed by class.
+
+        Observers are only created once the node has seen `observer_min_weight` on top of its initial class
+        observations.
+
+        The best suggestion of each attribute is cached. A cached suggestion is dirty once the weight seen by the
+        node has grown by more than `merit_cache_tolerance` relatively to the weight it was evaluated at, or once its
+        attribute has been disabled. Only dirty entries are evaluated again by `get_best_split_suggestions`.
+
+        Parameters
+        ----------
+        initial_class_observations: numpy.ndarray of shape (n_classes,)
+            Initial class observations
+
+        """
+
+        def __init__(self, initial_class_observations):
+            super().__init__(initial_class_observations)
+            self._numeric_observers = None
+            self._initial_weight = self.get_weight_seen()
+            # Dict of tuples (suggestion, weight seen at evaluation)
+            self._split_suggestion_cache = {}
+            # Tuple (null split suggestion, weight seen at evaluation)
+            self._null_split_cache = None
+
+        def _init_attribute_observers(self, X, ht):
+            nominal_attributes = ht.nominal_attributes if ht.nominal_attributes is not None else []
+            numeric_attributes = []
+            attribute_observers = {}
+            for i in range(len(X)):
+                if i in nominal_attributes:
+                    attribute_observers[i] = NominalCountObserver(dtype=ht._statistics_dtype)
+                else:
+                    numeric_attributes.append(i)
+            # swapped in at once, predictions read the observers without locking
+            self._attribute_observers = attribute_observers
+            self._numeric_observers = ht._new_numeric_observers(numeric_attributes)
+            # suggestions are kept in attribute order
+            self._split_suggestion_cache = dict.fromkeys(range(len(X)))
+
+        def learn_from_instance(self, X, y, weight, ht):
+            if y >= len(self._observed_class_distribution):
+                self._observed_class_distribution = grow_distribution(self._observed_class_distribution, y + 1)
+            self._observed_class_distribution[y] += weight
+
+            if self._numeric_observers is None:
+                if self.get_weight_seen() - self._initial_weight < ht.observer_min_weight:
+                    return
+                self._init_attribute_observers(X, ht)
+            self._numeric_observers.observe(X, y, weight)
+            for i, obs in self._attribute_observers.items():
+                obs.observe_attribute_class(X[i], y, weight)
+
+        def learn_from_batch(self, X, y, weight, ht):
+            """ Update the node with a batch of instances.
+
+            Parameters
+            ----------
+            X: numpy.ndarray of shape (n_samples, n_features)
+                Instances attributes.
+            y: numpy.ndarray of int of shape (n_samples,)
+                Instances classes.
+            weight: numpy.ndarray of shape (n_samples,)
+                Instances weights.
+            ht: HATT
+                Hoeffding Anytime Tree to update.
+
+            """
+            num_classes = max(len(self._observed_class_distribution), y.max() + 1)
+            if num_classes > len(self._observed_class_distribution):
+                self._observed_class_distribution = grow_distribution(self._observed_class_distribution, num_classes)
+            self._observed_class_distribution += np.bincount(y, weights=weight, minlength=num_classes)
+
+            if self._numeric_observers is None:
+                # observers start with the instance that brings the weight seen to observer_min_weight
+                weight_seen = self.get_weight_seen() - self._initial_weight - weight.sum() + np.cumsum(weight)
+                observed = weight_seen >= ht.observer_min_weight
+                if not observed.any():
+                    return
+                if not observed.all():
+                    X, y, weight = X[observed], y[observed], weight[observed]
+                self._init_attribute_observers(X[0], ht)
+            self._numeric_observers.observe_batch(X, y, weight)
+            for i, obs in self._attribute_observers.items():
+                obs.observe_batch(X[:, i], y, weight)
+
+        def get_weight_seen(self):
+            return float(self._observed_class_distribution.sum())
+
+        def observed_class_distribution_is_pure(self):
+            return np.count_nonzero(self._observed_class_distribution) < 2
+
+        def calculate_promise(self):
+            dist = self._observed_class_distribution
+            total_seen = dist.sum()
+            return total_seen - dist.max() if total_seen > 0 else 0
+
+        def describe_subtree(self, ht, buffer, indent=0):
+            buffer[0] += textwrap.indent('Leaf = ', ' ' * indent)
+            class_dist = ht.decode_class_distribution(self._observed_class_distribution)
+            class_val = ht.decode_class(int(np.argmax(self._observed_class_distribution)))
+            buffer[0] += 'Class {} | {}\n'.format(class_val, class_dist)
+
+        def get_naive_bayes_votes(self, X):
+            """ Same votes as `do_naive_bayes_prediction`, with the numeric densities computed at once. """
+            dist = self._observed_class_distribution
+            observed_class_sum = dist.sum()
+            if observed_class_sum == 0:
+                # No observed class distributions, all classes equal
+                return np.zeros(len(dist))
+            votes = dist.astype(float) / observed_class_sum
+            if self._numeric_observers is not None:
+                densities = self._numeric_observers.probability_density(X).prod(axis=0)
+                votes[len(densities):] = 0.0
+                votes[:len(densities)] *= densities[:len(votes)]
+            for i, obs in self._attribute_observers.items():
+                for c in np.flatnonzero(votes):
+                    votes[c] *= obs.probability_of_attribute_value_given_class(X[i], c)
+            return votes
+
+        def get_naive_bayes_batch_votes(self, X):
+            """ Naive Bayes votes for each instance of a batch, as an array of shape (n_samples, n_classes). """
+            dist = self._observed_class_distribution
+            observed_class_sum = dist.sum()
+            if observed_class_sum == 0:
+                return np.zeros((len(X), len(dist)))
+            votes = np.tile(dist.astype(float) / observed_class_sum, (len(X), 1))
+            if self._numeric_observers is not None:
+                densities = self._numeric_observers.probability_density(X).prod(axis=1)
+                num_classes = densities.shape[1]
+                votes[:, num_classes:] = 0.0
+                votes[:, :num_classes] *= densities[:, :votes.shape[1]]
+            for i, obs in self._attribute_observers.items():
+                probabilities = obs.class_probabilities(X[:, i])
+                votes[:, probabilities.shape[1]:] = 0.0
+                votes[:, :probabilities.shape[1]] *= probabilities[:, :votes.shape[1]]
+            return votes
+
+        def get_batch_class_votes(self, X, ht):
+            """ Class votes for each instance of a batch, as an array of shape (n_samples, n_classes). """
+            return np.tile(self._observed_class_distribution, (len(X), 1))
+
+        def disable_attribute(self, att_idx):
+            if self._numeric_observers is not None and att_idx in self._numeric_observers:
+                self._numeric_observers.disable(att_idx)
+            else:
+                self._attribute_observers.pop(att_idx, None)
+            self._split_suggestion_cache.pop(att_idx, None)
+
+        @staticmethod
+        def _is_dirty(evaluated_weight, weight_seen, tolerance, max_age):
+            age = weight_seen - evaluated_weight
+            return age > tolerance * evaluated_weight or age >= max_age
+
+        def _update_split_suggestions(self, criterion, ht, att_indices=None):
+            """ Evaluate again the dirty entries of the split suggestion cache, of the given attributes if any. """
+            weight_seen = self.get_weight_seen()
+            tolerance = ht.merit_cache_tolerance
+            max_age = ht._max_reevaluation_wait()
+            pre_split_dist = self._observed_class_distribution
+            if not ht.no_preprune:
+                if self._null_split_cache is None or self._is_dirty(self._null_split_cache[1], weight_seen, tolerance,
+                                                                    max_age):
+                    null_split = AttributeSplitSuggestion(None, [{}],
+                                                          criterion.get_merit_of_split(pre_split_dist, [pre_split_dist]))
+                    self._null_split_cache = (null_split, weight_seen)
+            if self._numeric_observers is None:
+                return
+
+            numeric_observers = self._numeric_observers
+            dirty_numeric_attributes = []
+            for i in numeric_observers.att_indices:
+                if att_indices is not None and i not in att_indices:
+                    continue
+                cached = self._split_suggestion_cache.get(i)
+                if cached is None or self._is_dirty(cached[1], weight_seen, tolerance, max_age):
+                    dirty_numeric_attributes.append(i)
+            if dirty_numeric_attributes:
+                suggestions = numeric_observers.get_best_split_suggestions(criterion, pre_split_dist,
+                                                                           dirty_numeric_attributes)
+                for i in dirty_numeric_attributes:
+                    self._split_suggestion_cache[i] = (suggestions.get(i), weight_seen)
+            for i, obs in self._attribute_observers.items():
+                if att_indices is not None and i not in att_indices:
+                    continue
+                cached = self._split_suggestion_cache.get(i)
+                if cached is None or self._is_dirty(cached[1], weight_seen, tolerance, max_age):
+                    suggestion = obs.get_best_evaluated_split_suggestion(criterion, pre_split_dist, i, ht.binary_split)
+                    self._split_suggestion_cache[i] = (suggestion, weight_seen)
+
+        def get_best_split_suggestions(self, criterion, ht):
+            self._update_split_suggestions(criterion, ht)
+            best_suggestions = [self._null_split_cache[0]] if not ht.no_preprune else []
+            for cached in self._split_suggestion_cache.values():
+                if cached is not None and cached[0] is not None:
+                    best_suggestions.append(cached[0])
+            return best_suggestions
+
+        def evaluate_split_test(self, criterion, split_test):
+            """ Score a given split test on the current statistics of the node, without using the cache.
+
+            Parameters
+            ----------
+            criterion: SplitCriterion
+                The splitting criterion to be used.
+            split_test: InstanceConditionalTest
+                Split to score, such as the one installed at an internal node.
+
+            Returns
+            -------
+            AttributeSplitSuggestion or None
+                Suggestion of `split_test`, None if its attribute is not observed.
+
+            """
+            att_idx = split_test.get_atts_test_depends_on()[0]
+            pre_split_dist = self._observed_class_distribution
+            if self._numeric_observers is not None and att_idx in self._numeric_observers:
+                return self._numeric_observers.get_split_suggestion(criterion, pre_split_dist, split_test)
+            obs = self._attribute_observers.get(att_idx)
+            if obs is None:
+                return None
+            return obs.get_split_suggestion(criterion, pre_split_dist, split_test)
+
+        def select_split_suggestions(self, criterion, ht, att_idx=None, att_indices=None):
+            """ Find the two best split suggestions, and the suggestion of a given split, in a single pass.
+
+            Suggestions are ranked as by a stable sort of `get_best_split_suggestions` on merit: among equal merits,
+            the null split comes first, then attributes by increasing index, and the last one ranks higher.
+
+            Parameters
+            ----------
+            criterion: SplitCriterion
+                The splitting criterion to be used.
+            ht: HATT
+                Hoeffding Anytime Tree.
+            att_idx: int or None
+                Attribute of the suggestion to look up, None for the null split.
+            att_indices: set of int or None
+                Attributes to consider, None for all of them.
+
+            Returns
+            -------
+            tuple (best, second best, looked up suggestion, evaluated weight)
+                Suggestions are None when they do not exist. The evaluated weight is the smallest weight seen by the
+                node when the suggestions that were considered were evaluated, the one their merits are estimated from.
+
+            """
+            self._update_split_suggestions(criterion, ht, att_indices)
+            best = second_best = named = None
+            evaluated_weight = self.get_weight_seen()
+            if not ht.no_preprune:
+                best, evaluated_weight = self._null_split_cache
+                if att_idx is None:
+                    named = best
+            for i, cached in self._split_suggestion_cache.items():
+                if cached is None or cached[0] is None or (att_indices is not None and i not in att_indices):
+                    continue
+                suggestion = cached[0]
+                evaluated_weight = min(evaluated_weight, cached[1])
+                if i == att_idx:
+                    named = suggestion
+                if best is None or suggestion.merit >= best.merit:
+                    second_best, best = best, suggestion
+                elif second_best is None or suggestion.merit >= second_best.merit:
+                    second_best = suggestion
+            return best, second_best, named, evaluated_weight
+
+
+    class HattLearningNodeNB(HoeffdingTree.LearningNodeNB, HattActiveLearningNode):
+
+        def get_class_votes(self, X, ht):
+            if self.get_weight_seen() >= ht.nb_threshold:
+                return self.get_naive_bayes_votes(X)
+            else:
+                return self._observed_class_distribution
+
+        def get_batch_class_votes(self, X, ht):
+            if self.get_weight_seen() >= ht.nb_threshold:
+                return self.get_naive_bayes_batch_votes(X)
+            else:
+                return np.tile(self._observed_class_distribution, (len(X), 1))
+
+
+    class HattLearningNodeNBAdaptive(HoeffdingTree.LearningNodeNBAdaptive, HattLearningNodeNB):
+
+        def _majority_class(self):
+            # All classes equal defaults to class 0
+            if len(self._observed_class_distribution) == 0:
+                return 0
+            return np.argmax(self._observed_class_distribution)
+
+        def _naive_bayes_classes(self, votes):
+            nb_classes = np.argmax(votes, axis=-1) if votes.shape[-1] > 0 else np.zeros(votes.shape[:-1], dtype=int)
+            if self._observed_class_distribution.any():
+                # No vote, default to the first observed class
+                first_observed = np.flatnonzero(self._observed_class_distribution)[0]
+                nb_classes = np.where(votes.any(axis=-1), nb_classes, first_observed)
+            return nb_classes
+
+        def learn_from_instance(self, X, y, weight, ht):
+            if self._majority_class() == y:
+                self._mc_correct_weight += weight
+            if self._naive_bayes_classes(self.get_naive_bayes_votes(X)) == y:
+                self._nb_correct_weight += weight
+            HATT.HattActiveLearningNode.learn_from_instance(self, X, y, weight, ht)
+
+        def learn_from_batch(self, X, y, weight, ht):
+            """ Update the node with a batch of instances.
+
+            Majority class and Naive Bayes predictions are all made with the statistics the node had before the batch.
+
+            """
+            self._mc_correct_weight += weight[y == self._majority_class()].sum()
+            nb_classes = self._naive_bayes_classes(self.get_naive_bayes_batch_votes(X))
+            self._nb_correct_weight += weight[nb_classes == y].sum()
+            HATT.HattActiveLearningNode.learn_from_batch(self, X, y, weight, ht)
+
+        def get_class_votes(self, X, ht):
+            if self._mc_correct_weight > self._nb_correct_weight:
+                return self._observed_class_distribution
+            return self.get_naive_bayes_votes(X)
+
+        def get_batch_class_votes(self, X, ht):
+            if self._mc_correct_weight > self._nb_correct_weight:
+                return np.tile(self._observed_class_distribution, (len(X), 1))
+            return self.get_naive_bayes_batch_votes(X)
+
+
+    class HattInactiveLearningNode(HoeffdingTree.InactiveLearningNode):
+        """ Learning node that only updates its class distribution.
+
+        Used for deactivated leaves, and as the learning node of internal nodes whose observers have been dropped.
+        Leaves that replaced an idle subtree are flagged as `collapsed`.
+
+        Parameters
+        ----------
+        initial_class_observations: numpy.ndarray of shape (n_classes,)
+            Initial class observations
+
+        """
+
+        collapsed = False
+
+        def learn_from_instance(self, X, y, weight, ht):
+            if y >= len(self._observed_class_distribution):
+                self._observed_class_distribution = grow_distribution(self._observed_class_distribution, y + 1)
+            self._observed_class_distribution[y] += weight
+
+        def learn_from_batch(self, X, y, weight, ht):
+            num_classes = max(len(self._observed_class_distribution), y.max() + 1)
+            if num_classes > len(self._observed_class_distribution):
+                self._observed_class_distribution = grow_distribution(self._observed_class_distribution, num_classes)
+            self._observed_class_distribution += np.bincount(y, weights=weight, minlength=num_classes)
+
+        def get_weight_seen(self):
+            return float(self._observed_class_distribution.sum())
+
+        def calculate_promise(self):
+            return HATT.HattActiveLearningNode.calculate_promise(self)
+
+        def describe_subtree(self, ht, buffer, indent=0):
+            HATT.HattActiveLearningNode.describe_subtree(self, ht, buffer, indent)
+
+        def get_class_votes(self, X, ht):
+            return self._observed_class_distribution
+
+        def get_batch_class_votes(self, X, ht):
+            return np.tile(self._observed_class_distribution, (len(X), 1))
 
 
     class HattSplitNode(HoeffdingTree.SplitNode):
 
-        def __init__(self, learning_node, split_test, class_observations):
+        def __init__(self, learning_node, split_test, class_observations, grace_period=0, depth=0):
             self.learning_node = learning_node
+            self.depth = depth
+            # Position of the next attributes of a rotating re-evaluation subspace
+            self._subspace_offset = 0
+            self._next_reevaluation_weight = learning_node.get_weight_seen() + grace_period
+            self._last_reevaluation_weight = learning_node.get_weight_seen()
+            self._last_merit_gap = 0.0
+            # Attribute of the split this node replaced
+            self._previous_att_idx = None
+            # Deferred re-evaluation state
+            self._queued = False
+            self._detached = False
             super().__init__(split_test, class_observations)
 
         def learn_from_instance(self, X, y, weight, ht):
+            if ht.lazy_internal_statistics:
+                child_index = self.instance_child_index(X)
+                if child_index >= 0 and self.get_child(child_index) is not None:
+                    # the child observes the attributes
+                    HATT.HattInactiveLearningNode.learn_from_instance(self.learning_node, X, y, weight, ht)
+                    return
             self.learning_node.learn_from_instance(X, y, weight, ht)
 
+        def learn_from_batch(self, X, y, weight, ht):
+            if ht.lazy_internal_statistics:
+                branches = self.instance_child_indices(X)
+                stopped = np.ones(len(X), dtype=bool)
+                for branch in np.unique(branches):
+                    if branch >= 0 and self.get_child(branch) is not None:
+                        stopped[branches == branch] = False
+                if not stopped.all():
+                    passed = ~stopped
+                    HATT.HattInactiveLearningNode.learn_from_batch(self.learning_node, X[passed], y[passed],
+                                                                   weight[passed], ht)
+                if not stopped.any():
+                    return
+                X, y, weight = X[stopped], y[stopped], weight[stopped]
+            self.learning_node.learn_from_batch(X, y, weight, ht)
+
+        def instance_child_indices(self, X):
+            """ Get the branch index of each instance of a batch, -1 if unknown. """
+            split_test = self._split_test
+            if isinstance(split_test, NumericAttributeBinaryTest):
+                values = X[:, split_test.get_atts_test_depends_on()[0]]
+                split_value = split_test.get_split_value()
+                equal_branch = 0 if split_test._equals_passes_test else 1
+                return np.where(values == split_value, equal_branch, np.where(values < split_value, 0, 1))
+            if isinstance(split_test, NominalAttributeBinaryTest):
+                values = X[:, split_test.get_atts_test_depends_on()[0]]
+                return np.where(np.trunc(values) == split_test._att_value, 0, 1)
+            if isinstance(split_test, NominalAttributeMultiwayTest):
+                # as in `CompiledTree`, values that are not integers, or missing, have no branch
+                values = X[:, split_test.get_atts_test_depends_on()[0]]
+                with np.errstate(invalid='ignore'):
+                    integral = np.isfinite(values) & (values == np.trunc(values))
+                return np.where(integral, values, -1).astype(int)
+            return np.array([split_test.branch_for_instance(x) for x in X], dtype=int)
+
+        def get_observed_class_distribution(self):
+            return self.learning_node.get_observed_class_distribution()
+
+        def get_class_votes(self, X, ht):
+            return self.learning_node.get_observed_class_distribution()
+
+        def get_batch_class_votes(self, X, ht):
+            return np.tile(self.learning_node.get_observed_class_distribution(), (len(X), 1))
+
+        def get_weight_seen(self):
+            return self.learning_node.get_weight_seen()
+
+        def subtree_depth(self):
+            # children are stored in a dict
+            child_depths = [child.subtree_depth() for child in self._children.values() if child is not None]
+            return max(child_depths, default=0) + 1
+
+        def is_reevaluation_due(self):
+            """ Whether the split should be re-evaluated, which requires the observers of the learning node. """
+            return (isinstance(self.learning_node, HoeffdingTree.ActiveLearningNode)
+                    and self.get_weight_seen() >= self._next_reevaluation_weight)
+
+        def set_next_reevaluation_weight(self, weight):
+            self._next_reevaluation_weight = weight
+
+        def record_reevaluation(self, merit_gap):
+            self._last_reevaluation_weight = self.get_weight_seen()
+            self._last_merit_gap = merit_gap
+
+        def reevaluation_priority(self):
+            """ Key of the node in the re-evaluation queue, lower keys come first. """
+            return self._last_reevaluation_weight - self.get_weight_seen(), -self._last_merit_gap
+
+
+    def encode_class(self, y):
+        """ Get the dense index of a class label, registering the label if it is new.
+
+        Labels passed as `classes` to `partial_fit` are registered first, in the given order, so that their indices
+        match the columns of `predict_proba`. Other labels get the next index on their first occurrence.
+
+        """
+        if not self._class_labels and self.classes is not None:
+            for label in self.classes:
+                self._register_class(label)
+        try:
+            return self._class_indices[y]
+        except KeyError:
+            return self._register_class(y)
+
+    def _register_class(self, y):
+        if y not in self._class_indices:
+            self._class_indices[y] = len(self._class_labels)
+            self._class_labels.append(y)
+        return self._class_indices[y]
+
+    def _output_columns(self, num_classes):
+        """ Map the first `num_classes` class indices to the columns of `predict_proba`, see `output_columns`.
+
+        Returns
+        -------
+        tuple (numpy.ndarray of int of shape (num_classes,), list)
+            Column of each class index, and label of each column.
+
+        """
+        layout = self._output_layout
+        if layout is not None and layout[0] == num_classes:
+            return layout[1], layout[2]
+        columns, column_labels = output_columns(self._class_labels[:num_classes])
+        self._output_layout = (num_classes, columns, column_labels)
+        return columns, column_labels
+
+    def decode_class(self, class_idx):
+        return self._class_labels[class_idx]
+
+    def decode_class_distribution(self, dist):
+        """ Convert a dense class distribution to a dict (class_value, weight) of its non-zero entries. """
+        return {self._class_labels[i]: dist[i] for i in np.flatnonzero(dist)}
+
+    # Override HoeffdingTree
+    def reset(self):
+        super().reset()
+        self._class_labels = []
+        self._class_indices = {}
+        self._output_layout = None
+        self._compiled_tree = None
+        self._internal_node_byte_size_estimate = 0.0
+        self._splits_at_last_estimate = 0
+        self._reevaluation_queue = []
+        self._random_state = check_random_state(self.random_state)
+        self._next_node_id = 0
+        self._dirty_nodes = None
+        self._checkpoint = None
+        self._change_log = None
+        return self
+
+    # Override HoeffdingTree
+    def _new_learning_node(self, initial_class_observations=None):
+        """ Create a new learning node.
+
+        `initial_class_observations` may be a dense vector, which is copied, or a dict (class index, weight) as
+        produced by the nominal attribute observers.
+
+        """
+        dist = np.zeros(len(self._class_labels), dtype=self._statistics_dtype)
+        if isinstance(initial_class_observations, dict):
+            for class_idx, weight in initial_class_observations.items():
+                if class_idx >= len(dist):
+                    dist = grow_distribution(dist, class_idx + 1)
+                dist[class_idx] = weight
+        elif initial_class_observations is not None:
+            dist = grow_distribution(np.asarray(initial_class_observations, dtype=dist.dtype), len(dist))
+        initial_class_observations = dist
+        if self._leaf_prediction == MAJORITY_CLASS:
+            return self.HattActiveLearningNode(initial_class_observations)
+        elif self._leaf_prediction == NAIVE_BAYES:
+            return self.HattLearningNodeNB(initial_class_observations)
+        else:
+            return self.HattLearningNodeNBAdaptive(initial_class_observations)
 
     def _sort_instance_to_leaf(self, X):
-        path = []
+        """ Walk down the tree along the path of an instance.
+
+        Yields (node, parent, parent_branch) tuples from the root to the reached node. The walk stops at a leaf, or at
+        a split node whose test gives an unknown branch or a missing child. The next child is only looked up when the
+        walk is resumed, so the caller may update the current node first, and stop the walk if it detaches the rest of
+        the path.
+
+        """
         current = self._tree_root
         parent = None
         branch = -1
-        while True:
-            path.append(HoeffdingTree.FoundNode(current, parent, branch))
-            if isinstance(current, HoeffdingTree.SplitNode):
-                child_index = current.instance_child_index(X)
-                if child_index >= 0:
-                    child = current.get_child(child_index)
-                    if child is not None:
-                        branch = child_index
-                        parent = current
-                        current = child
+        while current is not None:
+            yield current, parent, branch
+            if not isinstance(current, HoeffdingTree.SplitNode):
+                return
+            child_index = current.instance_child_index(X)
+            if child_index < 0:
+                return
+            parent = current
+            branch = child_index
+            current = current.get_child(child_index)
+
+    @property
+    def tree_version(self):
+        """ Number of structural changes of the tree: it grows each time the root or a child of a node is replaced. """
+        return self._tree_version
+
+    def get_compiled_tree(self):
+        """ Get the flat array form of the current tree structure, compiling it if the structure has changed. """
+        # the version is read before the root, so that a compiled tree is never older than its version
+        version = self._tree_version
+        compiled_tree = self._compiled_tree
+        if compiled_tree is None or compiled_tree.version != version:
+            root = self._tree_root
+            if root is None:
+                return None
+            compiled_tree = CompiledTree(root, version)
+            self._compiled_tree = compiled_tree
+        return compiled_tree
+
+    def _mark_dirty(self, node):
+        """ Record that a node of the tree changed since the last checkpoint and the last change log update. """
+        if self._dirty_nodes is not None:
+            self._dirty_nodes[node.node_id] = node
+        if self._change_log is not None:
+            self._change_log.dirty_nodes[node.node_id] = node
+
+    def _set_subtree(self, parent, parent_branch, node):
+        """ Replace the root, or a child of `parent`, and publish the new structure.
+
+        The new node and its children get a new `node_id`, and count as visited. The subtree is complete before it is
+        linked, and `parent` gets a new dict of children instead of an updated one: predictions walking the tree from
+        other threads see either the former subtree or the new one. `tree_version` is increased last.
+
+        """
+        new_nodes = [node]
+        if isinstance(node, self.SplitNode):
+            new_nodes.extend(child for child in node._children.values() if child is not None)
+        for new_node in new_nodes:
+            new_node.node_id = self._next_node_id
+            self._next_node_id += 1
+            new_node.last_visit = self._train_weight_seen_by_model
+            self._mark_dirty(new_node)
+        if parent is not None:
+            self._mark_dirty(parent)
+        replaced = self._tree_root if parent is None else parent.get_child(parent_branch)
+        if replaced is not None and self._dirty_nodes:
+            self._dirty_nodes.pop(replaced.node_id, None)
+        if replaced is not None and self._change_log is not None:
+            self._change_log.dirty_nodes.pop(replaced.node_id, None)
+        if self._reevaluation_queue:
+            replaced = self._tree_root if parent is None else parent.get_child(parent_branch)
+            if isinstance(replaced, self.HattSplitNode):
+                # queued nodes of the replaced subtree must not be re-evaluated
+                pending = [replaced]
+                while pending:
+                    split_node = pending.pop()
+                    split_node._detached = True
+                    pending.extend(child for child in split_node._children.values()
+                                   if isinstance(child, self.HattSplitNode))
+        if parent is None:
+            self._tree_root = node
+        else:
+            children = dict(parent._children)
+            children[parent_branch] = node
+            parent._children = children
+        self._tree_version += 1
+        if self._change_log is not None:
+            self._change_log.publish_subtree(parent, parent_branch, node)
+
+    # Override HoeffdingTree
+    def predict(self, X):
+        r, _ = get_dimensions(X)
+        if not self._class_labels:
+            return np.zeros(r, dtype=int)
+        y_proba = self.predict_proba(X)
+        _, column_labels = self._output_columns(len(self._class_labels))
+        return np.array([column_labels[i] for i in np.argmax(y_proba, axis=1)])
+
+    # Override HoeffdingTree
+    def predict_proba(self, X):
+        """ Predicts probabilities of all label of the X instance(s)
+
+        Columns follow the label values, as in `HoeffdingTree`: the column of a non-negative integer label is its value,
+        other labels are sorted, see `_output_columns`. Batches are sorted all at once through the compiled tree, then
+        the votes of each reached node are computed for all its instances.
+
+        Predictions may be made from other threads while the tree is trained, without locking: the root, or the
+        compiled tree, is read once, and structural changes never modify the nodes it leads to, see `_set_subtree`.
+        Leaves keep learning during the call, and classes registered meanwhile are left out of the result.
+
+        """
+        r, _ = get_dimensions(X)
+        num_classes = len(self._class_labels)
+        y_proba = np.zeros((r, max(num_classes, 1)))
+        root = self._tree_root
+        if root is None:
+            return y_proba
+        X = np.asarray(X).reshape(r, -1)
+        if r < COMPILED_TREE_MIN_SAMPLES:
+            for i in range(r):
+                found_node = root.filter_instance_to_leaf(X[i], None, -1)
+                node = found_node.node if found_node.node is not None else found_node.parent
+                votes = node.get_class_votes(X[i], self)[:num_classes]
+                y_proba[i, :len(votes)] = votes
+        else:
+            self._predict_compiled_votes(X, y_proba)
+        totals = y_proba.sum(axis=1, keepdims=True)
+        y_proba /= np.where(totals != 0, totals, 1.0)
+        if num_classes == 0:
+            return y_proba
+        columns, column_labels = self._output_columns(num_classes)
+        output = np.zeros((r, len(column_labels)))
+        output[:, columns] = y_proba
+        return output
+
+    def _predict_compiled_votes(self, X, y_proba):
+        """ Fill `y_proba` with the votes of the nodes reached by a batch in the compiled tree. """
+        compiled_tree = self.get_compiled_tree()
+        node_ids = compiled_tree.sort_instances(X)
+        order = np.argsort(node_ids, kind='stable')
+        reached, starts = np.unique(node_ids[order], return_index=True)
+        for node_id, rows in zip(reached, np.split(order, starts[1:])):
+            votes = compiled_tree.nodes[node_id].get_batch_class_votes(X[rows], self)[:, :y_proba.shape[1]]
+            y_proba[rows, :votes.shape[1]] = votes
+
+    # Override HoeffdingTree
+    def get_model_rules(self):
+        rules = []
+
+        def recurse(node, cur_rule):
+            if isinstance(node, self.SplitNode):
+                for i, child in node._children.items():
+                    r = copy.deepcopy(cur_rule)
+                    r.predicate_set.append(node.get_predicate(i))
+                    recurse(child, r)
             else:
-                break
-        return path
+                class_dist = self.decode_class_distribution(node.get_observed_class_distribution())
+                cur_rule.observed_class_distribution = class_dist
+                cur_rule.class_idx = max(class_dist.items(), key=itemgetter(1))[0] if class_dist else None
+                rules.append(cur_rule)
+
+        recurse(self._tree_root, Rule())
+        return rules
+
+    def save(self, path):
+        """ Save the tree to a binary snapshot file, see `snapshot.save_tree`. """
+        save_tree(self, path)
+
+    @classmethod
+    def load(cls, path, memory_map=True):
+        """ Load a tree from a snapshot file written by `save`.
+
+        With `memory_map`, the file is mapped copy-on-write and the node statistics are views of it: no array is
+        copied at load time, and processes forked after loading share the pages they do not update.
+
+        Parameters
+        ----------
+        path: str
+            Path of the snapshot file.
+        memory_map: boolean (default=True)
+            If False, the file is read into memory at once.
+
+        Returns
+        -------
+        HATT
+            The restored tree.
+
+        """
+        return load_tree(cls, path, memory_map)
+
+    def checkpoint(self, path, compaction_ratio=1.0):
+        """ Save the tree incrementally: only the nodes updated since the last checkpoint to `path` are written.
+
+        The first checkpoint writes a snapshot, the next ones append the updated nodes to a delta file, until it grows
+        larger than `compaction_ratio` times the snapshot, see `snapshot.checkpoint_tree`. Nodes are only tracked
+        from the first checkpoint on.
+
+        """
+        checkpoint_tree(self, path, compaction_ratio)
+
+    @classmethod
+    def recover(cls, path, memory_map=True):
+        """ Restore a tree from the snapshot and the delta file written by `checkpoint`. """
+        return recover_tree(cls, path, memory_map)
+
+    def start_change_log(self, sink, leaf_update_period=1000):
+        """ Publish the changes of the tree to `sink`, for `replication.TreeReplica` followers.
+
+        A snapshot of the tree is published first, then each structural change as soon as it happens, and the nodes
+        updated by training every `leaf_update_period` training weight, see `replication.ChangeLog`.
+
+        Parameters
+        ----------
+        sink: callable
+            Called with each record, as bytes.
+        leaf_update_period: float or None (default=1000)
+            Training weight between updates of the nodes, None to only publish them with `ChangeLog.publish_updates`.
+
+        Returns
+        -------
+        ChangeLog
+            The started change log.
+
+        """
+        self._change_log = ChangeLog(self, sink, leaf_update_period)
+        self._change_log.publish_snapshot()
+        return self._change_log
+
+    def stop_change_log(self):
+        """ Stop publishing the changes of the tree. """
+        self._change_log = None
+
+    # Override HoeffdingTree
+    def partial_fit(self, X, y, classes=None, sample_weight=None):
+        """ Incrementally trains the model, one instance at a time or, with `batch_learning`, one batch at a time.
+
+        Queued re-evaluations are then run within `reevaluation_time_budget`. See `HoeffdingTree.partial_fit`.
+
+        """
+        if self._tree_root is None:
+            self._check_reevaluation_subspace(get_dimensions(X)[1])
+        if not self.batch_learning or y is None or get_dimensions(X)[0] < 2:
+            super().partial_fit(X, y, classes, sample_weight)
+        else:
+            self._partial_fit_batch(X, y, classes, sample_weight)
+        if self.reevaluation_time_budget is not None and self._reevaluation_queue:
+            self._run_deferred_re_evaluations(time.perf_counter() + self.reevaluation_time_budget)
+        return self
+
+    def flush(self):
+        """ Run all the queued re-evaluations, see `reevaluation_time_budget`. """
+        self._run_deferred_re_evaluations(math.inf)
+        return self
+
+    def _run_deferred_re_evaluations(self, deadline):
+        """ Pop queued re-evaluations until the queue is empty or `deadline` (from `time.perf_counter`) is passed. """
+        queue = self._reevaluation_queue
+        while queue and time.perf_counter() < deadline:
+            _, _, haat_node, parent, parent_branch = heapq.heappop(queue)
+            haat_node._queued = False
+            if haat_node._detached:
+                continue
+            self._mark_dirty(haat_node)
+            if haat_node.is_reevaluation_due():
+                self._re_evaluate_best_split(haat_node, parent, parent_branch)
+
+    def _re_evaluate_when_due(self, haat_node, parent, parent_branch):
+        """ Re-evaluate the split of an internal node if it is due, or queue it if re-evaluations are deferred.
+
+        Returns
+        -------
+        boolean
+            True if the node has been replaced.
+
+        """
+        if not haat_node.is_reevaluation_due():
+            return False
+        if self.reevaluation_time_budget is None:
+            return self._re_evaluate_best_split(haat_node, parent, parent_branch)
+        if not haat_node._queued:
+            haat_node._queued = True
+            self._reevaluation_sequence += 1
+            heapq.heappush(self._reevaluation_queue, (haat_node.reevaluation_priority(), self._reevaluation_sequence,
+                                                      haat_node, parent, parent_branch))
+        return False
+
+    def _partial_fit_batch(self, X, y, classes, sample_weight):
+        if self.classes is None and classes is not None:
+            self.classes = classes
+        X = np.asarray(X)
+        row_cnt, _ = get_dimensions(X)
+        if sample_weight is None:
+            sample_weight = np.ones(row_cnt)
+        sample_weight = np.asarray(sample_weight, dtype=float)
+        if row_cnt != len(sample_weight):
+            raise ValueError('Inconsistent number of instances ({}) and weights ({}).'.format(row_cnt,
+                                                                                              len(sample_weight)))
+        nonzero = sample_weight != 0.0
+        if not nonzero.any():
+            return
+        labels, first_rows, inverse = np.unique(np.asarray(y)[nonzero], return_index=True, return_inverse=True)
+        # new labels are registered in order of first occurrence, as when learning one instance at a time
+        class_indices = np.zeros(len(labels), dtype=int)
+        for i in np.argsort(first_rows):
+            class_indices[i] = self.encode_class(labels[i])
+        y = class_indices[inverse.ravel()]
+        previous_weight_seen = self._train_weight_seen_by_model
+        self._train_weight_seen_by_model += sample_weight[nonzero].sum()
+        if self._tree_root is None:
+            self._set_subtree(None, -1, self._new_learning_node())
+        self._learn_from_batch(self._tree_root, None, -1, X[nonzero], y, sample_weight[nonzero])
+        self._run_periodic_tasks(previous_weight_seen)
+
+    def _run_periodic_tasks(self, previous_weight_seen):
+        """ Run the tasks whose period has been crossed since the training weight was `previous_weight_seen`. """
+        weight_seen = self._train_weight_seen_by_model
+        if previous_weight_seen // self.memory_estimate_period != weight_seen // self.memory_estimate_period:
+            self.estimate_model_byte_size()
+        if self.idle_horizon is not None and (previous_weight_seen // self.idle_horizon
+                                              != weight_seen // self.idle_horizon):
+            self.collapse_idle_subtrees()
+        log = self._change_log
+        if log is not None and log.leaf_update_period is not None and (
+                previous_weight_seen // log.leaf_update_period != weight_seen // log.leaf_update_period):
+            log.publish_updates()
+
+    def _learn_from_batch(self, node, parent, parent_branch, X, y, weight):
+        if isinstance(node, self.HattInactiveLearningNode) and node.collapsed:
+            node = self._activate_learning_node(node, parent, parent_branch)
+        node.last_visit = self._train_weight_seen_by_model
+        self._mark_dirty(node)
+        node.learn_from_batch(X, y, weight, self)
+        if isinstance(node, self.HattSplitNode):
+            if self._re_evaluate_when_due(node, parent, parent_branch):
+                # the subtree has been replaced
+                return
+            branches = node.instance_child_indices(X)
+            for branch in np.unique(branches):
+                child = node.get_child(branch) if branch >= 0 else None
+                if child is not None:
+                    mask = branches == branch
+                    self._learn_from_batch(child, node, branch, X[mask], y[mask], weight[mask])
+        elif self._growth_allowed and isinstance(node, self.ActiveLearningNode):
+            weight_seen = node.get_weight_seen()
+            if weight_seen - node.get_weight_seen_at_last_split_evaluation() >= self.grace_period:
+                self._attempt_to_split(node, parent, parent_branch)
+                node.set_weight_seen_at_last_split_evaluation(weight_seen)
 
     # Override HoeffdingTree
     def _partial_fit(self, X, y, weight):
 
+        y = self.encode_class(y)
+
         # initialize the tree
         if self._tree_root is None:
-            self._tree_root = self._new_learning_node()
-
-        # sort the example into a leaf
-        path = self._sort_instance_to_leaf(X)
-        leaf_node = path[-1].node
+            self._set_subtree(None, -1, self._new_learning_node())
+
+        # sort the example into a leaf, updating the nodes along its path
+        for node, parent, parent_branch in self._sort_instance_to_leaf(X):
+            if isinstance(node, self.HattInactiveLearningNode) and node.collapsed:
+                node = self._activate_learning_node(node, parent, parent_branch)
+            node.last_visit = self._train_weight_seen_by_model
+            self._mark_dirty(node)
+            node.learn_from_instance(X, y, weight, self)
+            if isinstance(node, self.HattSplitNode):
+                if self._re_evaluate_when_due(node, parent, parent_branch):
+                    # the rest of the path has been detached from the tree
+                    break
+            elif self._growth_allowed and isinstance(node, self.ActiveLearningNode):
+                weight_seen = node.get_weight_seen()
+                if weight_seen - node.get_weight_seen_at_last_split_evaluation() >= self.grace_period:
+                    self._attempt_to_split(node, parent, parent_branch)
+                    node.set_weight_seen_at_last_split_evaluation(weight_seen)
 
-        for found_node in path:
-            node = found_node.node
-            node.learn_from_instance(X, y, 1, self)
-            if node == leaf_node:
-                self._attempt_to_split(node, found_node.parent, found_node.parent_branch)
-            else:
-                self._re_evaluate_best_split(node, found_node.parent, found_node.parent_branch)
+        # the weight of the instance has already been counted by partial_fit
+        self._run_periodic_tasks(self._train_weight_seen_by_model - weight)
 
+    def _merge_subtree_statistics(self, haat_node):
+        """ Rebuild the statistics of an internal node whose statistics are lazy.
 
-    def _re_evaluate_best_split(self, haat_node, parent, parent_idx):
+        The learning node of the internal node holds the instances it saw before being split, and the ones that did
+        not go down to a child since. Each learning node below it holds the instances it saw since its creation, which
+        all went through the internal node.
 
-        learning_node = haat_node.learning_node
+        The copy shares the split suggestion cache of the learning node, which only holds suggestions and the weight they
+        were evaluated at. Nothing else refers to the merged observers, so they are released after the re-evaluation
+        unless the copy replaces the internal node.
 
-        if self._split_criterion == GINI_SPLIT:
-            split_criterion = GiniSplitCriterion()
-        elif self._split_criterion == INFO_GAIN_SPLIT:
-            split_criterion = InfoGainSplitCriterion()
-        else:
-            split_criterion = InfoGainSplitCriterion()
+        Returns
+        -------
+        HattActiveLearningNode
+            A copy of the learning node of `haat_node`, with the attribute observers of its whole subtree merged in.
 
-        best_split_suggestions = learning_node.get_best_split_suggestions(split_criterion, self)
-        best_split_suggestions.sort(key=attrgetter('merit'))
-        best_suggestion = best_split_suggestions[-1]
+        """
+        learning_node = haat_node.learning_node
+        subtree_nodes = []
+        pending = [child for child in haat_node._children.values() if child is not None]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, self.HattSplitNode):
+                pending.extend(child for child in node._children.values() if child is not None)
+                node = node.learning_node
+            if isinstance(node, self.HattActiveLearningNode) and node._numeric_observers is not None:
+                subtree_nodes.append(node)
+
+        merged = copy.copy(learning_node)
+        merged._observed_class_distribution = learning_node.get_observed_class_distribution().copy()
+        # the null split the learning node evaluated before its split is stale, and only the copy is evaluated
+        merged._null_split_cache = learning_node._null_split_cache = None
+        if learning_node._numeric_observers is None:
+            if not subtree_nodes:
+                return merged
+            learning_node = subtree_nodes.pop()
+        merged._numeric_observers = copy.deepcopy(learning_node._numeric_observers)
+        merged._numeric_observers.merge([node._numeric_observers for node in subtree_nodes])
+        merged._attribute_observers = {}
+        for i, obs in learning_node._attribute_observers.items():
+            merged._attribute_observers[i] = copy.deepcopy(obs)
+            merged._attribute_observers[i].merge(
+                [node._attribute_observers[i] for node in subtree_nodes if i in node._attribute_observers])
+        return merged
+
+    def _schedule_re_evaluation(self, haat_node, merit_range, merit_gap):
+        """ Postpone the next re-evaluation of an internal node.
+
+        The Hoeffding bound only shrinks as weight accumulates, so the current split cannot be replaced before the
+        bound drops below the last observed merit gap. The node is skipped until that point, waiting at least
+        `grace_period` and at most as much weight as it has already seen, so that a change in the gap is still noticed.
+        The wait never exceeds `max_reevaluation_period`.
+
+        Parameters
+        ----------
+        haat_node: HATT.HattSplitNode
+            The internal node that has just been re-evaluated.
+        merit_range: float
+            Range of the split criterion merit.
+        merit_gap: float
+            Merit difference between the best suggestion and the current split.
+
+        """
+        weight_seen = haat_node.get_weight_seen()
+        wait = weight_seen
+        if merit_gap > 0:
+            needed = merit_range * merit_range * self._hoeffding_bound_factor / (merit_gap * merit_gap)
+            wait = min(needed - weight_seen, wait)
+        haat_node.set_next_reevaluation_weight(weight_seen + min(max(wait, self.grace_period),
+                                                                 self._max_reevaluation_wait()))
+        haat_node.record_reevaluation(merit_gap)
+        self._mark_dirty(haat_node)
 
-        hoeffding_bound = self.compute_hoeffding_bound(
-            split_criterion.get_range_of_merit(learning_node.get_observed_class_distribution()),
-            self.split_confidence, learning_node.get_weight_seen())
 
-        current_split = None
-        for split_suggestion in best_split_suggestions:
-            if same_split(split_suggestion.split_test, haat_node._split_test):
-                current_split = split_suggestion
-                break
+    def _re_evaluate_best_split(self, haat_node, parent, parent_idx):
 
-        if (best_suggestion.merit - current_split.merit > hoeffding_bound):
-            if best_suggestion.split_test is None:
+        learning_node = haat_node.learning_node
+        if self.lazy_internal_statistics:
+            learning_node = self._merge_subtree_statistics(haat_node)
+
+        split_criterion = self._criterion
+        current_att_idx = haat_node._split_test.get_atts_test_depends_on()[0]
+        best_suggestion, _, _, evaluated_weight = learning_node.select_split_suggestions(
+            split_criterion, self, current_att_idx, self._reevaluation_attributes(haat_node, learning_node))
+        # the installed threshold, rather than the best one of the current attribute
+        current_split = learning_node.evaluate_split_test(split_criterion, haat_node._split_test)
+
+        merit_range = split_criterion.get_range_of_merit(learning_node.get_observed_class_distribution())
+        if current_split is None:
+            # the current attribute is not observed, nothing to compare with
+            self._schedule_re_evaluation(haat_node, merit_range, 0)
+            return False
+        hoeffding_bound = self._hoeffding_bound(merit_range, evaluated_weight)
+
+        # a better threshold on the current attribute replaces the split as another attribute would
+        merit_gap = best_suggestion.merit - current_split.merit
+        if merit_gap > hoeffding_bound and not same_split_test(best_suggestion.split_test, haat_node._split_test):
+            if self._keeps_split(haat_node, best_suggestion, merit_gap, hoeffding_bound):
+                self.number_of_rebuilds_avoided += 1
+                self.rebuild_nodes_avoided += count_subtree_nodes(haat_node)
+            elif best_suggestion.split_test is None:
                 # replace with a leaf, i.e. the learning node in this case
                 self.number_of_unsplits += 1
-                if parent is None:
-                    self._tree_root = learning_node
-                else:
-                    parent.set_child(parent_idx, learning_node)
+                self._set_subtree(parent, parent_idx, learning_node)
                 return True
-            elif current_split.split_test != best_suggestion.split_test:
+            else:
 
                 # replace with a node that splits on best_suggestion
                 new_split = self.HattSplitNode(
                     learning_node,
                     best_suggestion.split_test,
-                    learning_node.get_observed_class_distribution()
+                    learning_node.get_observed_class_distribution(),
+                    max(self.grace_period, self.resplit_cooldown),
+                    haat_node.depth
                 )
+                if best_suggestion.split_test.get_atts_test_depends_on()[0] != current_att_idx:
+                    new_split._previous_att_idx = current_att_idx
+                else:
+                    new_split._previous_att_idx = haat_node._previous_att_idx
 
                 for i in range(best_suggestion.num_splits()):
                     new_child = self._new_learning_node(best_suggestion.resulting_class_distribution_from_split(i))
                     new_split.set_child(i, new_child)
 
                 self.number_of_resplits += 1
-                if parent is None:
-                    self._tree_root = new_split
-                else:
-                    parent.set_child(parent_idx, new_split)
+                self._set_subtree(parent, parent_idx, new_split)
+                self._manage_memory()
                 return True
 
+        self._schedule_re_evaluation(haat_node, merit_range, merit_gap)
         return False
 
+    def _reevaluation_attributes(self, haat_node, learning_node):
+        """ Choose the attributes evaluated by a re-evaluation, see `reevaluation_subspace`.
+
+        Returns
+        -------
+        set of int or None
+            Attributes to evaluate, None for all of them.
+
+        """
+        subspace = self.reevaluation_subspace
+        if subspace is None:
+            return None
+        if isinstance(subspace, (list, tuple)):
+            subspace = subspace[min(haat_node.depth, len(subspace) - 1)]
+        attributes = list(learning_node._split_suggestion_cache)
+        if 0 < subspace < 1:
+            subspace = math.ceil(subspace * len(attributes))
+        current_att_idx = haat_node._split_test.get_atts_test_depends_on()[0]
+        others = [i for i in attributes if i != current_att_idx]
+        num_others = int(subspace) - 1
+        if num_others >= len(others):
+            return None
+        if self.reevaluation_subspace_sampling == ROTATING_SUBSPACE:
+            start = haat_node._subspace_offset % len(others)
+            chosen = (others[start:] + others[:start])[:num_others]
+            haat_node._subspace_offset = start + num_others
+        else:
+            chosen = [others[i] for i in self._random_state.choice(len(others), num_others, replace=False)]
+        return set(chosen) | {current_att_idx}
+
+    def _check_reevaluation_subspace(self, num_attributes=None):
+        """ Raise a ValueError if `reevaluation_subspace` is invalid, for instances of `num_attributes` if known. """
+        subspace = self.reevaluation_subspace
+        if subspace is None:
+            return
+        sizes = subspace if isinstance(subspace, (list, tuple)) else [subspace]
+        if not sizes:
+            raise ValueError('reevaluation_subspace must not be an empty list')
+        for size in sizes:
+            if not isinstance(size, numbers.Real) or size <= 0 or (size >= 1 and not float(size).is_integer()):
+                raise ValueError('reevaluation_subspace must be a fraction in (0, 1) or a positive number of '
+                                 'attributes, got {}'.format(size))
+            if num_attributes is not None and size > num_attributes:
+                raise ValueError('reevaluation_subspace of {} attributes, but instances have {}'.format(
+                    size, num_attributes))
+
+    def _keeps_split(self, haat_node, best_suggestion, merit_gap, hoeffding_bound):
+        """ Whether `resplit_hysteresis` keeps a split that the best suggestion beats by the Hoeffding bound. """
+        if not self.resplit_hysteresis:
+            return False
+        margin = self.tie_threshold
+        split_test = best_suggestion.split_test
+        if split_test is not None and split_test.get_atts_test_depends_on()[0] == haat_node._previous_att_idx:
+            margin *= 2
+        return merit_gap <= hoeffding_bound + margin
+
     # Override HoeffdingTree
     def _attempt_to_split(self, node, parent, parent_idx):
 
         if not node.observed_class_distribution_is_pure():
-            if self._split_criterion == GINI_SPLIT:
-                split_criterion = GiniSplitCriterion()
-            elif self._split_criterion == INFO_GAIN_SPLIT:
-                split_criterion = InfoGainSplitCriterion()
+            split_criterion = self._criterion
+            best_suggestion, second_best_suggestion, no_split, evaluated_weight = node.select_split_suggestions(
+                split_criterion, self)
+
+            hoeffding_bound = self._hoeffding_bound(
+                split_criterion.get_range_of_merit(node.get_observed_class_distribution()), evaluated_weight)
+
+            if self.no_preprune:
+                # without pre-pruning, the best suggestion is compared to the second best one, and close suggestions
+                # are a tie broken once the bound is small enough, as in a Hoeffding Tree
+                reference = second_best_suggestion
+                tie = hoeffding_bound < self.tie_threshold
             else:
-                split_criterion = InfoGainSplitCriterion()
-
-            best_split_suggestions = node.get_best_split_suggestions(split_criterion, self)
-            best_split_suggestions.sort(key=attrgetter('merit'))
-
-            hoeffding_bound = self.compute_hoeffding_bound(
-                split_criterion.get_range_of_merit(node.get_observed_class_distribution()),
-                self.split_confidence, node.get_weight_seen())
-
-            best_suggestion = best_split_suggestions[-1]
-
-            no_split = None
-            for split_suggestion in best_split_suggestions:
-                if split_suggestion.split_test is None:
-                    no_split = split_suggestion
-                    break
+                reference = no_split
+                tie = False
 
             # split according to best_suggestion
-            if (best_suggestion.merit - no_split.merit > hoeffding_bound and best_suggestion is not None):
+            if (best_suggestion is not None and best_suggestion.split_test is not None
+                    and (reference is None or best_suggestion.merit - reference.merit > hoeffding_bound or tie)):
 
                 new_split = self.HattSplitNode(
                     node,
                     best_suggestion.split_test,
-                    node.get_observed_class_distribution()
+                    node.get_observed_class_distribution(),
+                    max(self.grace_period, self.resplit_cooldown),
+                    parent.depth + 1 if parent is not None else 0
                 )
 
                 for i in range(best_suggestion.num_splits()):
@@ -281,14 +1526,316 @@ class HATT(HoeffdingTree):
                     new_split.set_child(i, new_child)
 
                 self.number_of_splits += 1
-                if parent is None:
-                    self._tree_root = new_split
+                self._set_subtree(parent, parent_idx, new_split)
+                self._manage_memory()
+
+    def _manage_memory(self):
+        """ Enforce the memory limit after the tree has grown.
+
+        Node sizes are measured again each time the number of splits has doubled, instead of only every
+        `memory_estimate_period` instances, so that the estimates follow the growth of a young tree.
+
+        """
+        splits = self.number_of_splits + self.number_of_resplits
+        if splits >= 2 * self._splits_at_last_estimate:
+            self._splits_at_last_estimate = splits
+            self.estimate_model_byte_size()
+        else:
+            self.enforce_tracker_limit()
+
+    def memory_report(self):
+        """ Measure the memory used by the attribute observers of the leaves.
+
+        Every leaf is measured, which is as slow as `measure_byte_size`.
+
+        Returns
+        -------
+        dict
+            - 'model_byte_size': size of the whole model
+            - 'active_leaves': number of active leaves
+            - 'leaves_without_observers': active leaves that have not created their observers yet
+            - 'observer_byte_size': size of the observers of the other active leaves
+            - 'observer_byte_size_saved': estimated size of the observers that leaves without observers would have, at
+              the mean size of the existing ones
+
+        """
+        active_leaves = 0
+        observing_leaves = 0
+        observer_byte_size = 0
+        for found_node in self._find_nodes():
+            node = found_node.node
+            if isinstance(node, self.HattActiveLearningNode):
+                active_leaves += 1
+                if node._numeric_observers is not None:
+                    observing_leaves += 1
+                    observer_byte_size += object_byte_size((node._numeric_observers, node._attribute_observers))
+        mean_observer_byte_size = observer_byte_size / observing_leaves if observing_leaves > 0 else 0.0
+        return {'model_byte_size': self.measure_byte_size(),
+                'active_leaves': active_leaves,
+                'leaves_without_observers': active_leaves - observing_leaves,
+                'observer_byte_size': observer_byte_size,
+                'observer_byte_size_saved': (active_leaves - observing_leaves) * mean_observer_byte_size}
+
+    def _find_nodes(self):
+        """ Find all the nodes of the tree, in depth-first order.
+
+        Returns
+        -------
+        list
+            List of `FoundNode`, split nodes included.
+
+        """
+        found = []
+        pending = [(self._tree_root, None, -1)] if self._tree_root is not None else []
+        while pending:
+            node, parent, parent_branch = pending.pop()
+            found.append(self.FoundNode(node, parent, parent_branch))
+            if isinstance(node, self.SplitNode):
+                for branch, child in node._children.items():
+                    if child is not None:
+                        pending.append((child, node, branch))
+        return found
+
+    # Override HoeffdingTree
+    def _find_learning_nodes(self):
+        return [found_node for found_node in self._find_nodes() if isinstance(found_node.node, self.LearningNode)]
+
+    # Override HoeffdingTree
+    def measure_byte_size(self):
+        return object_byte_size(self)
+
+    # Override HoeffdingTree
+    def estimate_model_byte_size(self):
+        """ Measure the size of the nodes and of the model, and enforce the memory limit if it is exceeded.
+
+        The learning nodes of internal nodes are measured apart from leaves. Those without observers count as inactive
+        learning nodes.
+
+        """
+        # Number and total size of each kind of learning node
+        sizes = {'active': [0, 0], 'inactive': [0, 0], 'internal': [0, 0]}
+        decision_node_cnt = 0
+        for found_node in self._find_nodes():
+            node = found_node.node
+            if isinstance(node, self.HattSplitNode):
+                decision_node_cnt += 1
+                node = node.learning_node
+                kind = 'internal' if isinstance(node, self.ActiveLearningNode) else 'inactive'
+            else:
+                kind = 'active' if isinstance(node, self.ActiveLearningNode) else 'inactive'
+            sizes[kind][0] += 1
+            sizes[kind][1] += object_byte_size(node)
+        self._decision_node_cnt = decision_node_cnt
+        self._active_leaf_node_cnt = sizes['active'][0]
+        self._inactive_leaf_node_cnt = sizes['inactive'][0] - (decision_node_cnt - sizes['internal'][0])
+        if sizes['active'][0] > 0:
+            self._active_leaf_byte_size_estimate = sizes['active'][1] / sizes['active'][0]
+        if sizes['inactive'][0] > 0:
+            self._inactive_leaf_byte_size_estimate = sizes['inactive'][1] / sizes['inactive'][0]
+        if sizes['internal'][0] > 0:
+            self._internal_node_byte_size_estimate = sizes['internal'][1] / sizes['internal'][0]
+        actual_model_size = object_byte_size(self)
+        estimated_model_size = (sizes['active'][0] * self._active_leaf_byte_size_estimate
+                                + sizes['inactive'][0] * self._inactive_leaf_byte_size_estimate
+                                + sizes['internal'][0] * self._internal_node_byte_size_estimate)
+        if estimated_model_size > 0:
+            self._byte_size_estimate_overhead_fraction = actual_model_size / estimated_model_size
+        if actual_model_size > self.max_byte_size:
+            self.enforce_tracker_limit()
+
+    # Override HoeffdingTree
+    def enforce_tracker_limit(self):
+        """ Deactivate leaves and strip internal nodes until the estimated size fits in `max_byte_size`.
+
+        Leaves are ranked by promise, followed by the internal nodes that still have observers, ranked by promise as
+        well. Internal nodes have seen the weight of their whole subtree, so ranking them with the leaves would keep
+        their observers at the expense of every leaf. From the first ranked node, nodes are kept active, or reactivated
+        for inactive leaves, as long as they fit in the memory limit. The remaining ones are deactivated, or stripped
+        of their observers: internal nodes are stripped before any leaf is deactivated. Stripped internal nodes keep
+        their split and do not get their observers back. Leaves collapsed by `idle_horizon` are left inactive, and do
+        not stop the growth of the tree with `stop_mem_management`.
+
+        """
+        inactive_size = self._inactive_leaf_byte_size_estimate
+        active_size = self._active_leaf_byte_size_estimate
+        internal_size = self._internal_node_byte_size_estimate or active_size
+        # Every node costs at least the size of an inactive learning node, candidates may cost an extra size
+        base_size = 0.0
+        extra_size = 0.0
+        candidates = []
+        has_inactive = False
+        for found_node in self._find_nodes():
+            node = found_node.node
+            base_size += inactive_size
+            if isinstance(node, self.HattSplitNode):
+                if isinstance(node.learning_node, self.ActiveLearningNode):
+                    promise = node.learning_node.calculate_promise()
+                    candidates.append((False, promise, found_node, internal_size - inactive_size))
+                    extra_size += internal_size - inactive_size
                 else:
-                    parent.set_child(parent_idx, new_split)
+                    has_inactive = True
+            elif isinstance(node, self.ActiveLearningNode):
+                candidates.append((True, node.calculate_promise(), found_node, active_size - inactive_size))
+                extra_size += active_size - inactive_size
+            elif node.collapsed:
+                # idle leaves are not a sign of memory pressure, and are reactivated when an instance reaches them
+                continue
+            else:
+                candidates.append((True, node.calculate_promise(), found_node, active_size - inactive_size))
+                has_inactive = True
+        byte_size = (base_size + extra_size) * self._byte_size_estimate_overhead_fraction
+        if has_inactive or byte_size > self.max_byte_size:
+            if self.stop_mem_management:
+                self._growth_allowed = False
+                return
+
+        budget = self.max_byte_size / self._byte_size_estimate_overhead_fraction - base_size
+        # leaves first, then by promise
+        candidates.sort(key=itemgetter(0, 1), reverse=True)
+        for _, _, found_node, node_extra_size in candidates:
+            node = found_node.node
+            if node_extra_size <= budget:
+                budget -= node_extra_size
+                if isinstance(node, self.HattInactiveLearningNode):
+                    self._activate_learning_node(node, found_node.parent, found_node.parent_branch)
+            else:
+                # less promising nodes do not take the remaining space
+                budget = -math.inf
+                if isinstance(node, self.HattSplitNode):
+                    self._strip_internal_node(node)
+                elif isinstance(node, self.ActiveLearningNode):
+                    self._deactivate_learning_node(node, found_node.parent, found_node.parent_branch)
+
+    # Override HoeffdingTree
+    def _deactivate_learning_node(self, to_deactivate, parent, parent_branch):
+        new_leaf = self.HattInactiveLearningNode(to_deactivate.get_observed_class_distribution())
+        self._set_subtree(parent, parent_branch, new_leaf)
+        self._active_leaf_node_cnt -= 1
+        self._inactive_leaf_node_cnt += 1
+
+    # Override HoeffdingTree
+    def _activate_learning_node(self, to_activate, parent, parent_branch):
+        new_leaf = self._new_learning_node(to_activate.get_observed_class_distribution())
+        self._set_subtree(parent, parent_branch, new_leaf)
+        self._active_leaf_node_cnt += 1
+        self._inactive_leaf_node_cnt -= 1
+        return new_leaf
+
+    def collapse_idle_subtrees(self):
+        """ Collapse the subtrees and active leaves that no instance reached during the last `idle_horizon` weight.
+
+        Each of them is replaced by an inactive leaf with its class distribution, flagged as collapsed so that it is
+        activated again by the next instance that reaches it.
+
+        """
+        if self._tree_root is None or self.idle_horizon is None:
+            return
+        idle_since = self._train_weight_seen_by_model - self.idle_horizon
+        pending = [(self._tree_root, None, -1)]
+        while pending:
+            node, parent, parent_branch = pending.pop()
+            if node.last_visit >= idle_since:
+                if isinstance(node, self.SplitNode):
+                    pending.extend((child, node, branch) for branch, child in node._children.items()
+                                   if child is not None)
+                continue
+            if isinstance(node, self.HattSplitNode):
+                collapsed = self.HattInactiveLearningNode(node.get_observed_class_distribution())
+                self._set_subtree(parent, parent_branch, collapsed)
+            elif isinstance(node, self.ActiveLearningNode):
+                self._deactivate_learning_node(node, parent, parent_branch)
+                collapsed = self._tree_root if parent is None else parent.get_child(parent_branch)
+            else:
+                continue
+            collapsed.collapsed = True
+            self.number_of_collapses += 1
+            self.collapsed_nodes += count_subtree_nodes(node)
+
+    def _strip_internal_node(self, split_node):
+        """ Replace the learning node of an internal node by one without observers, keeping its split. """
+        class_distribution = split_node.learning_node.get_observed_class_distribution()
+        split_node.learning_node = self.HattInactiveLearningNode(class_distribution)
+        self._mark_dirty(split_node)
+
 
 
+def grow_distribution(dist, num_classes):
+    """ Copy a dense class distribution, padded with zeros up to `num_classes` entries. """
+    grown = np.zeros(max(num_classes, len(dist)), dtype=dist.dtype)
+    grown[:len(dist)] = dist
+    return grown
 
-def same_split(split_a, split_b):
-    if split_a is None or split_b is None:
-        return split_a is None and split_b is None
-    return split_a._att_idx == split_b._att_idx
+
+def output_columns(labels):
+    """ Map class labels, in their encoding order, to the columns of `predict_proba`, in label value order.
+
+    As in `HoeffdingTree`, when all labels are non-negative integers, the column of a label is its value, and there are
+    as many columns as the largest label plus one. Other labels are sorted.
+
+    Returns
+    -------
+    tuple (numpy.ndarray of int of shape (len(labels),), list)
+        Column of each label, and label of each column.
+
+    """
+    num_classes = len(labels)
+    if all(isinstance(label, numbers.Real) and label >= 0 and float(label).is_integer() for label in labels):
+        columns = np.array([int(label) for label in labels], dtype=int)
+        column_labels = list(range(columns.max() + 1 if num_classes else 0))
+    else:
+        order = sorted(range(num_classes), key=labels.__getitem__)
+        columns = np.empty(num_classes, dtype=int)
+        columns[order] = np.arange(num_classes)
+        column_labels = [labels[i] for i in order]
+    return columns, column_labels
+
+
+def same_split_test(split_test, other):
+    """ Whether two split tests, or None for no split, send every instance down the same branch. """
+    if split_test is None or other is None:
+        return split_test is other
+    return type(split_test) is type(other) and vars(split_test) == vars(other)
+
+
+def count_subtree_nodes(node):
+    """ Count the nodes of the subtree rooted at `node`, `node` included. """
+    count = 0
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        count += 1
+        if isinstance(node, HoeffdingTree.SplitNode):
+            pending.extend(child for child in node._children.values() if child is not None)
+    return count
+
+
+def object_byte_size(obj):
+    """ Size in bytes of an object and of the objects it refers to.
+
+    Same traversal as `calculate_object_size`, except that NumPy arrays are measured as a whole instead of element by
+    element, which is both faster and closer to their actual size.
+
+    """
+    seen = set()
+    to_visit = deque([obj])
+    byte_size = 0
+    while to_visit:
+        obj = to_visit.popleft()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        byte_size += sys.getsizeof(obj)
+        if isinstance(obj, np.ndarray):
+            # the data of views is held by their base array, arrays of a snapshot only account for their own data
+            if isinstance(obj.base, np.ndarray):
+                to_visit.append(obj.base)
+            elif obj.base is not None:
+                byte_size += obj.nbytes
+        elif isinstance(obj, dict):
+            to_visit.extend(obj.values())
+            to_visit.extend(obj.keys())
+        elif hasattr(obj, '__dict__'):
+            to_visit.append(obj.__dict__)
+        elif hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes, bytearray)):
+            to_visit.extend(obj)
+    return byte_size
@@ -0,0 +1,161 @@
+from collections import deque
+
+import numpy as np
+
+from skmultiflow.trees.nominal_attribute_binary_test import NominalAttributeBinaryTest
+from skmultiflow.trees.nominal_attribute_multiway_test import NominalAttributeMultiwayTest
+from skmultiflow.trees.numeric_attribute_binary_test import NumericAttributeBinaryTest
+
+
+LEAF = -1
+GENERIC_TEST = 0
+NUMERIC_BINARY_TEST = 1
+NOMINAL_BINARY_TEST = 2
+NOMINAL_MULTIWAY_TEST = 3
+
+
+class CompiledTree(object):
+    """ Flat array representation of the structure of a tree, used to sort batches of instances at once.
+
+    Nodes are numbered in breadth-first order, the root being node 0. For each node, the arrays give the kind of its
+    split test (`LEAF` for leaves), the attribute it tests, the split value, the branch taken by instances equal to the
+    split value, and the position and number of its children in `children`. Missing children are stored as -1.
+    Instances stop at the deepest node whose test leads to an existing child, as in `filter_instance_to_leaf`.
+
+    Only the structure is compiled: node objects are kept in `nodes`, so that votes are read from their current
+    statistics. The compiled tree remains valid until a node is split, or a split node is replaced.
+
+    Parameters
+    ----------
+    root: Node
+        Root of the tree to compile.
+    version: int (default=0)
+        Version of the tree structure, see `HATT.tree_version`.
+
+    """
+
+    def __init__(self, root, version=0):
+        self.version = version
+        self.nodes = []
+        kinds = []
+        features = []
+        thresholds = []
+        equal_branches = []
+        child_offsets = []
+        num_branches = []
+        children = []
+
+        # children slots are filled once the child has been numbered
+        pending = deque([(root, -1)])
+        while pending:
+            node, slot = pending.popleft()
+            node_id = len(self.nodes)
+            if slot >= 0:
+                children[slot] = node_id
+            self.nodes.append(node)
+            kind, feature, threshold, equal_branch = LEAF, -1, 0.0, 0
+            branches = {}
+            split_test = getattr(node, '_split_test', None)
+            if split_test is not None:
+                kind, feature, threshold, equal_branch = compile_split_test(split_test)
+                branches = node._children
+            child_offsets.append(len(children))
+            width = 0
+            for branch in branches:
+                if branch >= 0:
+                    width = max(width, int(branch) + 1)
+            num_branches.append(width)
+            children.extend([-1] * width)
+            for branch, child in branches.items():
+                if child is not None and branch >= 0:
+                    pending.append((child, child_offsets[-1] + int(branch)))
+            kinds.append(kind)
+            features.append(feature)
+            thresholds.append(threshold)
+            equal_branches.append(equal_branch)
+
+        self.kinds = np.array(kinds, dtype=int)
+        self.features = np.array(features, dtype=int)
+        self.thresholds = np.array(thresholds, dtype=float)
+        self.equal_branches = np.array(equal_branches, dtype=int)
+        self.child_offsets = np.array(child_offsets, dtype=int)
+        self.num_branches = np.array(num_branches, dtype=int)
+        self.children = np.array(children, dtype=int)
+        self._numeric_only = bool(np.all((self.kinds == NUMERIC_BINARY_TEST) | (self.kinds == LEAF)))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def sort_instances(self, X):
+        """ Get the id of the node reached by each instance of a batch.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of shape (n_samples, n_features)
+            Instances attributes.
+
+        Returns
+        -------
+        numpy.ndarray of int of shape (n_samples,)
+            Index, in `nodes`, of the node reached by each instance.
+
+        """
+        X = np.asarray(X)
+        node_ids = np.zeros(len(X), dtype=int)
+        rows = np.arange(len(X)) if self.kinds[0] != LEAF else np.zeros(0, dtype=int)
+        while len(rows) > 0:
+            current = node_ids[rows]
+            branches = self._branches(X, rows, current)
+            num_branches = self.num_branches[current]
+            valid = (branches >= 0) & (branches < num_branches)
+            next_ids = np.full(len(rows), -1)
+            next_ids[valid] = self.children[self.child_offsets[current[valid]] + branches[valid]]
+            moved = next_ids >= 0
+            rows = rows[moved]
+            node_ids[rows] = next_ids[moved]
+            rows = rows[self.kinds[node_ids[rows]] != LEAF]
+        return node_ids
+
+    def _branches(self, X, rows, current):
+        features = self.features[current]
+        if self._numeric_only:
+            values = X[rows, features]
+            thresholds = self.thresholds[current]
+            return np.where(values == thresholds, self.equal_branches[current], np.where(values < thresholds, 0, 1))
+        kinds = self.kinds[current]
+        if np.issubdtype(X.dtype, np.number):
+            values = X[rows, features].astype(float)
+        else:
+            values = np.zeros(len(rows))
+            typed = kinds != GENERIC_TEST
+            values[typed] = X[rows[typed], features[typed]].astype(float)
+        thresholds = self.thresholds[current]
+        branches = np.full(len(rows), -1)
+
+        numeric = kinds == NUMERIC_BINARY_TEST
+        v, t = values[numeric], thresholds[numeric]
+        branches[numeric] = np.where(v == t, self.equal_branches[current[numeric]], np.where(v < t, 0, 1))
+
+        with np.errstate(invalid='ignore'):
+            integral = np.isfinite(values) & (values == np.trunc(values))
+        binary = kinds == NOMINAL_BINARY_TEST
+        branches[binary] = np.where(np.trunc(values[binary]) == thresholds[binary], 0, 1)
+        multiway = (kinds == NOMINAL_MULTIWAY_TEST) & integral
+        branches[multiway] = values[multiway].astype(int)
+
+        for i in np.flatnonzero(kinds == GENERIC_TEST):
+            branch = self.nodes[current[i]].instance_child_index(X[rows[i]])
+            branches[i] = branch if branch == int(branch) else -1
+        return branches
+
+
+def compile_split_test(split_test):
+    """ Get the kind, attribute, split value and branch of equal values of a split test. """
+    if isinstance(split_test, NumericAttributeBinaryTest):
+        return (NUMERIC_BINARY_TEST, split_test.get_atts_test_depends_on()[0], split_test.get_split_value(),
+                0 if split_test._equals_passes_test else 1)
+    if isinstance(split_test, NominalAttributeBinaryTest):
+        return NOMINAL_BINARY_TEST, split_test._att_idx, split_test._att_value, 0
+    if isinstance(split_test, NominalAttributeMultiwayTest):
+        return NOMINAL_MULTIWAY_TEST, split_test._att_idx, 0.0, 0
+    return GENERIC_TEST, 0, 0.0, 0
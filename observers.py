@@ -0,0 +1,930 @@
+import math
+
+import numpy as np
+from scipy.special import ndtr
+
+from skmultiflow.trees.attribute_class_observer import AttributeClassObserver
+from skmultiflow.trees.attribute_split_suggestion import AttributeSplitSuggestion
+from skmultiflow.trees.nominal_attribute_binary_test import NominalAttributeBinaryTest
+from skmultiflow.trees.nominal_attribute_multiway_test import NominalAttributeMultiwayTest
+from skmultiflow.trees.numeric_attribute_binary_test import NumericAttributeBinaryTest
+
+
+NORMAL_CONSTANT = math.sqrt(2 * math.pi)
+
+
+class GaussianObserverStore(object):
+    """ Gaussian estimators of all the numeric attributes of a node.
+
+    Replaces one `NumericAttributeClassObserverGaussian` per attribute, each holding one `GaussianEstimator` per class,
+    with five (attributes x classes) arrays: the weight, mean, M2 (weighted sum of squared deviations), min and max of
+    the values observed for each class. Estimates are updated with the same incremental method as `GaussianEstimator`,
+    for all attributes at once.
+
+    Parameters
+    ----------
+    att_indices: list of int
+        Indices, in the instances, of the observed attributes.
+
+    num_bin_options: int (default=10)
+        Number of candidate thresholds per attribute.
+
+    dtype: numpy.dtype (default=numpy.float64)
+        Type of the stored statistics. Updates and split evaluations are computed in double precision.
+
+    """
+
+    def __init__(self, att_indices, num_bin_options=10, dtype=np.float64):
+        self.att_indices = np.asarray(att_indices, dtype=int)
+        self.num_bin_options = num_bin_options
+        self._rows = {att_idx: row for row, att_idx in enumerate(att_indices)}
+        self._active = np.ones(len(att_indices), dtype=bool)
+        shape = (len(att_indices), 0)
+        self._weight = np.zeros(shape, dtype=dtype)
+        self._mean = np.zeros(shape, dtype=dtype)
+        self._m2 = np.zeros(shape, dtype=dtype)
+        self._min_value = np.full(shape, np.inf, dtype=dtype)
+        self._max_value = np.full(shape, -np.inf, dtype=dtype)
+
+    def __contains__(self, att_idx):
+        return att_idx in self._rows
+
+    def num_classes(self):
+        return self._weight.shape[1]
+
+    def _grow(self, num_classes):
+        pad = ((0, 0), (0, num_classes - self.num_classes()))
+        self._weight = np.pad(self._weight, pad)
+        self._mean = np.pad(self._mean, pad)
+        self._m2 = np.pad(self._m2, pad)
+        self._min_value = np.pad(self._min_value, pad, constant_values=np.inf)
+        self._max_value = np.pad(self._max_value, pad, constant_values=-np.inf)
+
+    def observe(self, X, class_idx, weight):
+        """ Update the estimators of class `class_idx` with the values of an instance.
+
+        Missing (non finite) values and disabled attributes are ignored.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of length equal to the number of features.
+            Instance attributes.
+        class_idx: int
+            Instance class.
+        weight: float
+            Instance weight.
+
+        """
+        if class_idx >= self.num_classes():
+            self._grow(class_idx + 1)
+        values = np.asarray(X, dtype=float)[self.att_indices]
+        observed = np.isfinite(values) & self._active
+        if observed.all():
+            rows = slice(None)
+        else:
+            rows = np.flatnonzero(observed)
+            values = values[rows]
+        weight_sum = np.asarray(self._weight[rows, class_idx], dtype=float) + weight
+        delta = values - self._mean[rows, class_idx]
+        mean = self._mean[rows, class_idx] + weight * delta / weight_sum
+        self._m2[rows, class_idx] += weight * delta * (values - mean)
+        self._mean[rows, class_idx] = mean
+        self._weight[rows, class_idx] = weight_sum
+        self._min_value[rows, class_idx] = np.minimum(self._min_value[rows, class_idx], values)
+        self._max_value[rows, class_idx] = np.maximum(self._max_value[rows, class_idx], values)
+
+    def observe_batch(self, X, y, weight):
+        """ Update the estimators with a batch of instances.
+
+        The moments of the instances of each class are computed at once and merged into the stored ones with the
+        pairwise update of Chan et al., which gives the same statistics as observing the instances one by one.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of shape (n_samples, n_features)
+            Instances attributes.
+        y: numpy.ndarray of int of shape (n_samples,)
+            Instances classes.
+        weight: numpy.ndarray of shape (n_samples,)
+            Instances weights.
+
+        """
+        num_classes = y.max() + 1
+        if num_classes > self.num_classes():
+            self._grow(num_classes)
+        values = np.asarray(X, dtype=float)[:, self.att_indices]
+        observed = np.isfinite(values) & self._active
+        weights = np.where(observed, weight[:, None], 0.0)
+        values = np.where(observed, values, 0.0)
+        # Per class sums are computed as products with the (classes x samples) indicator matrix
+        indicator = np.zeros((self.num_classes(), len(y)))
+        indicator[y, np.arange(len(y))] = 1.0
+        batch_weight = (indicator @ weights).T
+        has_weight = batch_weight > 0.0
+        batch_mean = (indicator @ (weights * values)).T / np.where(has_weight, batch_weight, 1.0)
+        deviations = values - batch_mean.T[y]
+        batch_m2 = (indicator @ (weights * deviations * deviations)).T
+
+        weight_sum = self._weight + batch_weight
+        safe_weight_sum = np.where(weight_sum > 0.0, weight_sum, 1.0)
+        delta = batch_mean - self._mean
+        self._m2 += batch_m2 + delta * delta * self._weight * batch_weight / safe_weight_sum
+        self._mean += np.where(has_weight, delta * batch_weight / safe_weight_sum, 0.0)
+        self._weight[...] = weight_sum
+
+        batch_min = np.full((self.num_classes(), len(self.att_indices)), np.inf)
+        np.minimum.at(batch_min, y, np.where(observed, values, np.inf))
+        batch_max = np.full((self.num_classes(), len(self.att_indices)), -np.inf)
+        np.maximum.at(batch_max, y, np.where(observed, values, -np.inf))
+        np.minimum(self._min_value, batch_min.T, out=self._min_value)
+        np.maximum(self._max_value, batch_max.T, out=self._max_value)
+
+    def merge(self, others):
+        """ Add the statistics of other stores, observing the same attributes, to the ones of this store.
+
+        The moments of all the stores are combined at once, as if their instances had been observed by this store.
+
+        Parameters
+        ----------
+        others: list of GaussianObserverStore
+            Stores to merge into this one.
+
+        """
+        if not others:
+            return
+        num_classes = max([self.num_classes()] + [other.num_classes() for other in others])
+        if num_classes > self.num_classes():
+            self._grow(num_classes)
+        pad = [((0, 0), (0, num_classes - other.num_classes())) for other in others]
+        weights = np.stack([self._weight] + [np.pad(o._weight, p) for o, p in zip(others, pad)]).astype(float)
+        means = np.stack([self._mean] + [np.pad(o._mean, p) for o, p in zip(others, pad)]).astype(float)
+        m2s = np.stack([self._m2] + [np.pad(o._m2, p) for o, p in zip(others, pad)]).astype(float)
+
+        weight_sum = weights.sum(axis=0)
+        safe_weight_sum = np.where(weight_sum > 0.0, weight_sum, 1.0)
+        mean = (weights * means).sum(axis=0) / safe_weight_sum
+        deviations = means - mean
+        self._m2[...] = (m2s + weights * deviations * deviations).sum(axis=0)
+        self._mean[...] = np.where(weight_sum > 0.0, mean, self._mean)
+        self._weight[...] = weight_sum
+        for other, p in zip(others, pad):
+            np.minimum(self._min_value, np.pad(other._min_value, p, constant_values=np.inf), out=self._min_value)
+            np.maximum(self._max_value, np.pad(other._max_value, p, constant_values=-np.inf), out=self._max_value)
+
+    def disable(self, att_idx):
+        """ Stop observing an attribute and forget its statistics. """
+        row = self._rows[att_idx]
+        self._active[row] = False
+        self._weight[row] = 0.0
+        self._mean[row] = 0.0
+        self._m2[row] = 0.0
+        self._min_value[row] = np.inf
+        self._max_value[row] = -np.inf
+
+    def is_active(self, att_idx):
+        return self._active[self._rows[att_idx]]
+
+    def get_arrays(self):
+        """ Get the state of the store as a dict of arrays, scalars being 0-d arrays. """
+        return {'att_indices': self.att_indices, 'num_bin_options': np.array(self.num_bin_options),
+                'active': self._active, 'weight': self._weight, 'mean': self._mean, 'm2': self._m2,
+                'min_value': self._min_value, 'max_value': self._max_value}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ Rebuild a store from the arrays of `get_arrays`, which are used without copy. """
+        store = cls(arrays['att_indices'].tolist(), int(arrays['num_bin_options']), arrays['weight'].dtype)
+        store._active = arrays['active']
+        store._weight = arrays['weight']
+        store._mean = arrays['mean']
+        store._m2 = arrays['m2']
+        store._min_value = arrays['min_value']
+        store._max_value = arrays['max_value']
+        return store
+
+    def std_dev(self):
+        return self._std_dev(self._weight, self._m2)
+
+    @staticmethod
+    def _std_dev(weight, m2):
+        weight = np.asarray(weight, dtype=float)
+        variance = np.where(weight > 1.0, m2 / np.where(weight > 1.0, weight - 1.0, 1.0), 0.0)
+        # weights other than 1 can leave m2 slightly negative, through the rounding of the mean
+        return np.sqrt(np.maximum(variance, 0.0))
+
+    def probability_density(self, X):
+        """ Compute the density of the values of an instance, or of a batch of instances, for each attribute and class.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of length n_features, or of shape (n_samples, n_features)
+            Instance(s) attributes.
+
+        Returns
+        -------
+        numpy.ndarray of shape (n_attributes, n_classes), or (n_samples, n_attributes, n_classes)
+            Densities, 0 for classes that were not observed.
+
+        """
+        # arrays are read once, and cut to the classes they all have if the tree grows them meanwhile
+        weight, mean, m2 = self._weight, self._mean, self._m2
+        num_classes = min(weight.shape[1], mean.shape[1], m2.shape[1])
+        weight, mean, m2 = weight[:, :num_classes], mean[:, :num_classes], m2[:, :num_classes]
+        values = np.asarray(X, dtype=float)[..., self.att_indices][..., None]
+        std_dev = self._std_dev(weight, m2)
+        safe_std_dev = np.where(std_dev > 0.0, std_dev, 1.0)
+        diff = values - mean
+        density = np.exp(-(diff * diff / (2.0 * safe_std_dev * safe_std_dev))) / (NORMAL_CONSTANT * safe_std_dev)
+        density = np.where(std_dev > 0.0, density, np.where(diff == 0.0, 1.0, 0.0))
+        return np.where(weight > 0.0, density, 0.0)
+
+    def get_best_split_suggestions(self, criterion, pre_split_dist, att_indices):
+        """ Find the best binary split of each of the given attributes.
+
+        Mirrors `NumericAttributeClassObserverGaussian.get_best_evaluated_split_suggestion`: candidate thresholds are
+        evenly spread between the min and max values of each attribute. The class distributions of every (attribute,
+        threshold) pair are derived and scored in a single batch.
+
+        Parameters
+        ----------
+        criterion: VectorizedSplitCriterion
+            The splitting criterion to be used.
+        pre_split_dist: numpy.ndarray of shape (n_classes,)
+            Class distribution at the node.
+        att_indices: list of int
+            Attributes to evaluate.
+
+        Returns
+        -------
+        dict (attribute id, AttributeSplitSuggestion)
+            Best suggestion of each attribute that has at least one candidate threshold.
+
+        """
+        rows = np.array([self._rows[i] for i in att_indices], dtype=int)
+        num_classes = max(self.num_classes(), len(pre_split_dist))
+        pad = ((0, 0), (0, num_classes - self.num_classes()))
+        min_values = np.pad(self._min_value[rows].astype(float), pad, constant_values=np.inf)
+        max_values = np.pad(self._max_value[rows].astype(float), pad, constant_values=-np.inf)
+        pre_split_dists = np.zeros(num_classes)
+        pre_split_dists[:len(pre_split_dist)] = pre_split_dist
+
+        # Candidate thresholds, shape (attributes, bins)
+        att_min = min_values.min(axis=1)
+        att_max = max_values.max(axis=1)
+        bin_size = (att_max - att_min) / (float(self.num_bin_options) + 1.0)
+        with np.errstate(invalid='ignore'):
+            values = att_min[:, None] + bin_size[:, None] * np.arange(1, self.num_bin_options + 1)
+            valid = (values > att_min[:, None]) & (values < att_max[:, None])
+        valid &= self._active[rows, None]
+
+        post_split_dists = self._split_distributions(rows, values, num_classes)
+        merits = criterion.get_merits_of_splits(
+            pre_split_dists, post_split_dists.reshape(-1, 2, num_classes)).reshape(values.shape)
+        merits = np.where(valid, merits, -np.inf)
+        best_bins = np.argmax(merits, axis=1)
+        # all candidates may be -inf, keep the first valid one in that case
+        best_bins = np.where(np.isneginf(merits[np.arange(len(rows)), best_bins]), np.argmax(valid, axis=1), best_bins)
+
+        suggestions = {}
+        for a, att_idx in enumerate(att_indices):
+            b = best_bins[a]
+            if valid[a, b]:
+                suggestions[att_idx] = AttributeSplitSuggestion(
+                    NumericAttributeBinaryTest(att_idx, values[a, b], True),
+                    [post_split_dists[a, b, 0].copy(), post_split_dists[a, b, 1].copy()],
+                    merits[a, b])
+        return suggestions
+
+    def get_split_suggestion(self, criterion, pre_split_dist, split_test):
+        """ Score a given binary split of an attribute, such as the one installed at an internal node.
+
+        Parameters
+        ----------
+        criterion: VectorizedSplitCriterion
+            The splitting criterion to be used.
+        pre_split_dist: numpy.ndarray of shape (n_classes,)
+            Class distribution at the node.
+        split_test: NumericAttributeBinaryTest
+            Split to score.
+
+        Returns
+        -------
+        AttributeSplitSuggestion or None
+            Suggestion of `split_test`, None if its attribute is not observed.
+
+        """
+        row = self._rows.get(split_test.get_atts_test_depends_on()[0])
+        if row is None or not self._active[row]:
+            return None
+        num_classes = max(self.num_classes(), len(pre_split_dist))
+        pre_split_dists = np.zeros(num_classes)
+        pre_split_dists[:len(pre_split_dist)] = pre_split_dist
+        post_split_dist = self._split_distributions(np.array([row]), np.array([[split_test.get_split_value()]]),
+                                                    num_classes)[0, 0]
+        merit = criterion.get_merits_of_splits(pre_split_dists, post_split_dist[None])[0]
+        return AttributeSplitSuggestion(split_test, [post_split_dist[0], post_split_dist[1]], merit)
+
+    def _split_distributions(self, rows, values, num_classes):
+        """ Estimate the class distributions on each side of thresholds, values equal to a threshold going left.
+
+        Parameters
+        ----------
+        rows: numpy.ndarray of int of shape (n_attributes,)
+            Rows of the attributes.
+        values: numpy.ndarray of shape (n_attributes, n_thresholds)
+            Thresholds of each attribute.
+        num_classes: int
+            Number of classes of the distributions, at least the number of observed classes.
+
+        Returns
+        -------
+        numpy.ndarray of shape (n_attributes, n_thresholds, 2, num_classes)
+
+        """
+        pad = ((0, 0), (0, num_classes - self.num_classes()))
+        v = values[:, :, None]
+        w = np.pad(self._weight[rows].astype(float), pad)[:, None, :]
+        mean = np.pad(self._mean[rows].astype(float), pad)[:, None, :]
+        std_dev = np.pad(self.std_dev()[rows], pad)[:, None, :]
+        below_min = v < np.pad(self._min_value[rows].astype(float), pad, constant_values=np.inf)[:, None, :]
+        above_max = v >= np.pad(self._max_value[rows].astype(float), pad, constant_values=-np.inf)[:, None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gaussian_lhs = np.where(std_dev > 0.0,
+                                    ndtr((v - mean) / np.where(std_dev > 0.0, std_dev, 1.0)) * w,
+                                    np.where(v <= mean, w, 0.0))
+        lhs = np.where(below_min, 0.0, np.where(above_max, w, gaussian_lhs))
+        rhs = np.where(below_min, w, np.where(above_max, 0.0, np.maximum(w - gaussian_lhs, 0.0)))
+        return np.stack((lhs, rhs), axis=2)
+
+
+class HistogramObserverStore(object):
+    """ Fixed size histograms of all the numeric attributes of a node.
+
+    Each attribute has `num_bins` equal width bins, holding the weight observed in the bin for each class. The first
+    two distinct values of an attribute set its range, which is then doubled, by merging pairs of adjacent bins, every
+    time a value falls outside of it. The statistics of a node therefore take `num_bins` x `n_classes` floats per
+    attribute, whatever the number of observed instances.
+
+    Split candidates are the boundaries between bins: the class distributions on each side of every boundary are the
+    cumulative sums of the bins, and all the candidates of all the attributes are scored in a single batch.
+
+    Exposes the same methods as `GaussianObserverStore`.
+
+    Parameters
+    ----------
+    att_indices: list of int
+        Indices, in the instances, of the observed attributes.
+
+    num_bins: int (default=64)
+        Number of bins per attribute.
+
+    dtype: numpy.dtype (default=numpy.float64)
+        Type of the bin weights. Split evaluations and densities are computed in double precision.
+
+    """
+
+    def __init__(self, att_indices, num_bins=64, dtype=np.float64):
+        if num_bins < 2:
+            raise ValueError('A histogram needs at least 2 bins, got {}'.format(num_bins))
+        self.att_indices = np.asarray(att_indices, dtype=int)
+        self.num_bins = num_bins
+        self._rows = {att_idx: row for row, att_idx in enumerate(att_indices)}
+        self._active = np.ones(len(att_indices), dtype=bool)
+        # Lower bound and width of the bins of each attribute. An attribute that only observed a single value stores it
+        # as its lower bound with a width of 0, an attribute that observed nothing has a NaN lower bound.
+        self._low = np.full(len(att_indices), np.nan)
+        self._width = np.zeros(len(att_indices))
+        self._counts = np.zeros((len(att_indices), num_bins, 0), dtype=dtype)
+
+    def __contains__(self, att_idx):
+        return att_idx in self._rows
+
+    def num_classes(self):
+        return self._counts.shape[2]
+
+    def _grow(self, num_classes):
+        self._counts = np.pad(self._counts, ((0, 0), (0, 0), (0, num_classes - self.num_classes())))
+
+    def _bin_indices(self, rows, values):
+        width = self._width[rows]
+        with np.errstate(invalid='ignore'):
+            bins = np.floor((values - self._low[rows]) / np.where(width > 0.0, width, 1.0))
+        bins = np.where((width > 0.0) & np.isfinite(bins), bins, 0.0)
+        return np.clip(bins, 0, self.num_bins - 1).astype(int)
+
+    def _cover(self, rows, low_values, high_values):
+        """ Extend the range of the histograms of some attributes to include the given values. """
+        for row, low_value, high_value in zip(rows, low_values, high_values):
+            low, width = self._low[row], self._width[row]
+            if low <= low_value and high_value < low + self.num_bins * width or low == low_value == high_value:
+                continue
+            if width == 0.0:
+                if not np.isnan(low):
+                    low_value, high_value = min(low_value, low), max(high_value, low)
+                if low_value == high_value:
+                    self._low[row] = low_value
+                    continue
+                # extreme values fall at the center of the first and last bins
+                new_width = (high_value - low_value) / (self.num_bins - 1)
+                new_low = low_value - new_width / 2.0
+            else:
+                new_low, new_width = low, width
+                while low_value < new_low or high_value >= new_low + self.num_bins * new_width:
+                    if low_value < new_low:
+                        new_low -= self.num_bins * new_width
+                    new_width *= 2.0
+            if not np.isnan(low):
+                self._counts[row] = self._rebinned(self._counts[row], low, width, new_low, new_width)
+            self._low[row], self._width[row] = new_low, new_width
+
+    def _rebinned(self, counts, low, width, new_low, new_width):
+        """ Move the weights of bins to the bins of another range holding their centers. """
+        centers = low + (np.arange(self.num_bins) + 0.5) * width
+        bins = np.clip(np.floor((centers - new_low) / new_width), 0, self.num_bins - 1).astype(int)
+        rebinned = np.zeros_like(counts)
+        np.add.at(rebinned, bins, counts)
+        return rebinned
+
+    def observe(self, X, class_idx, weight):
+        """ Update the histograms of class `class_idx` with the values of an instance.
+
+        Missing (non finite) values and disabled attributes are ignored.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of length equal to the number of features.
+            Instance attributes.
+        class_idx: int
+            Instance class.
+        weight: float
+            Instance weight.
+
+        """
+        if class_idx >= self.num_classes():
+            self._grow(class_idx + 1)
+        values = np.asarray(X, dtype=float)[self.att_indices]
+        rows = np.flatnonzero(np.isfinite(values) & self._active)
+        values = values[rows]
+        bins = self._bin_indices(rows, values)
+        with np.errstate(invalid='ignore'):
+            outside = ~((values >= self._low[rows]) & (values < self._low[rows] + self.num_bins * self._width[rows]))
+        outside &= values != self._low[rows]
+        if outside.any():
+            self._cover(rows[outside], values[outside], values[outside])
+            bins = self._bin_indices(rows, values)
+        self._counts[rows, bins, class_idx] += weight
+
+    def observe_batch(self, X, y, weight):
+        """ Update the histograms with a batch of instances.
+
+        The range of each histogram is extended once to the batch values, then all the weights are added at once.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of shape (n_samples, n_features)
+            Instances attributes.
+        y: numpy.ndarray of int of shape (n_samples,)
+            Instances classes.
+        weight: numpy.ndarray of shape (n_samples,)
+            Instances weights.
+
+        """
+        num_classes = y.max() + 1
+        if num_classes > self.num_classes():
+            self._grow(num_classes)
+        values = np.asarray(X, dtype=float)[:, self.att_indices]
+        observed = np.isfinite(values) & self._active
+        rows = np.flatnonzero(observed.any(axis=0))
+        low_values = np.where(observed, values, np.inf).min(axis=0)[rows]
+        high_values = np.where(observed, values, -np.inf).max(axis=0)[rows]
+        self._cover(rows, low_values, high_values)
+
+        samples, atts = np.nonzero(observed)
+        bins = self._bin_indices(atts, values[samples, atts])
+        np.add.at(self._counts, (atts, bins, y[samples]), weight[samples])
+
+    def merge(self, others):
+        """ Add the histograms of other stores, observing the same attributes, to the ones of this store.
+
+        The range of each histogram is extended to the ranges of the other ones, and the weight of each of their bins
+        is added to the bin holding its center.
+
+        Parameters
+        ----------
+        others: list of HistogramObserverStore
+            Stores to merge into this one.
+
+        """
+        num_classes = max([self.num_classes()] + [other.num_classes() for other in others])
+        if num_classes > self.num_classes():
+            self._grow(num_classes)
+        for other in others:
+            rows = np.flatnonzero(~np.isnan(other._low) & self._active)
+            self._cover(rows, other._low[rows] + 0.5 * other._width[rows],
+                        other._low[rows] + (other.num_bins - 0.5) * other._width[rows])
+            for row in rows:
+                counts = np.pad(other._counts[row], ((0, 0), (0, num_classes - other.num_classes())))
+                self._counts[row] += self._rebinned(counts, other._low[row], other._width[row], self._low[row],
+                                                    self._width[row]) if self._width[row] > 0.0 else counts
+
+    def disable(self, att_idx):
+        """ Stop observing an attribute and forget its statistics. """
+        row = self._rows[att_idx]
+        self._active[row] = False
+        self._low[row] = np.nan
+        self._width[row] = 0.0
+        self._counts[row] = 0.0
+
+    def is_active(self, att_idx):
+        return self._active[self._rows[att_idx]]
+
+    def get_arrays(self):
+        """ Get the state of the store as a dict of arrays, scalars being 0-d arrays. """
+        return {'att_indices': self.att_indices, 'active': self._active, 'low': self._low, 'width': self._width,
+                'counts': self._counts}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ Rebuild a store from the arrays of `get_arrays`, which are used without copy. """
+        counts = arrays['counts']
+        store = cls(arrays['att_indices'].tolist(), counts.shape[1], counts.dtype)
+        store._active = arrays['active']
+        store._low = arrays['low']
+        store._width = arrays['width']
+        store._counts = counts
+        return store
+
+    def probability_density(self, X):
+        """ Compute the density of the values of an instance, or of a batch of instances, for each attribute and class.
+
+        The density of a value is the probability of its bin divided by the width of the bin. Bin probabilities are
+        smoothed with one instance per bin, so that a single empty bin does not cancel Naive Bayes votes: values outside
+        of the histogram get the probability of an empty bin. Missing values have a density of 1.
+
+        Parameters
+        ----------
+        X: numpy.ndarray of length n_features, or of shape (n_samples, n_features)
+            Instance(s) attributes.
+
+        Returns
+        -------
+        numpy.ndarray of shape (n_attributes, n_classes), or (n_samples, n_attributes, n_classes)
+            Densities, 0 for classes that were not observed.
+
+        """
+        values = np.asarray(X, dtype=float)[..., self.att_indices]
+        rows = np.broadcast_to(np.arange(len(self.att_indices)), values.shape)
+        bins = self._bin_indices(rows, values)
+        with np.errstate(invalid='ignore'):
+            inside = (values >= self._low) & (values < self._low + self.num_bins * self._width)
+        inside |= (self._width == 0.0) & (values == self._low)
+        # read once, the tree may grow it meanwhile
+        all_counts = self._counts
+        class_weights = all_counts.sum(axis=1, dtype=float)
+        width = np.where(self._width > 0.0, self._width, 1.0)[:, None]
+        counts = np.where(inside[..., None], all_counts[rows, bins], 0.0)
+        density = (counts + 1.0) / ((class_weights + self.num_bins) * width)
+        density = np.where(class_weights > 0.0, density, 0.0)
+        return np.where(np.isfinite(values)[..., None], density, 1.0)
+
+    def get_best_split_suggestions(self, criterion, pre_split_dist, att_indices):
+        """ Find the best binary split of each of the given attributes.
+
+        Instances lower than the boundary of a candidate go down the first branch. Boundaries with no weight on one of
+        their sides are not candidates.
+
+        Parameters
+        ----------
+        criterion: VectorizedSplitCriterion
+            The splitting criterion to be used.
+        pre_split_dist: numpy.ndarray of shape (n_classes,)
+            Class distribution at the node.
+        att_indices: list of int
+            Attributes to evaluate.
+
+        Returns
+        -------
+        dict (attribute id, AttributeSplitSuggestion)
+            Best suggestion of each attribute that has at least one candidate boundary.
+
+        """
+        rows = np.array([self._rows[i] for i in att_indices], dtype=int)
+        num_classes = max(self.num_classes(), len(pre_split_dist))
+        counts = np.pad(self._counts[rows].astype(float), ((0, 0), (0, 0), (0, num_classes - self.num_classes())))
+        pre_split_dists = np.zeros(num_classes)
+        pre_split_dists[:len(pre_split_dist)] = pre_split_dist
+
+        # Class distributions on each side of each boundary, shape (attributes, boundaries, classes)
+        cumulative = np.cumsum(counts, axis=1)
+        lhs = cumulative[:, :-1]
+        rhs = cumulative[:, -1:] - lhs
+        post_split_dists = np.stack((lhs, rhs), axis=2)
+        valid = (lhs.sum(axis=2) > 0.0) & (rhs.sum(axis=2) > 0.0)
+        valid &= (self._active[rows] & (self._width[rows] > 0.0))[:, None]
+        values = self._low[rows, None] + self._width[rows, None] * np.arange(1, self.num_bins)
+
+        merits = criterion.get_merits_of_splits(
+            pre_split_dists, post_split_dists.reshape(-1, 2, num_classes)).reshape(values.shape)
+        merits = np.where(valid, merits, -np.inf)
+        best_bins = np.argmax(merits, axis=1)
+        best_bins = np.where(np.isneginf(merits[np.arange(len(rows)), best_bins]), np.argmax(valid, axis=1), best_bins)
+
+        suggestions = {}
+        for a, att_idx in enumerate(att_indices):
+            b = best_bins[a]
+            if valid[a, b]:
+                suggestions[att_idx] = AttributeSplitSuggestion(
+                    NumericAttributeBinaryTest(att_idx, values[a, b], False),
+                    [post_split_dists[a, b, 0].copy(), post_split_dists[a, b, 1].copy()],
+                    merits[a, b])
+        return suggestions
+
+    def get_split_suggestion(self, criterion, pre_split_dist, split_test):
+        """ Score a given binary split of an attribute, such as the one installed at an internal node.
+
+        Bins whose center is lower than the threshold go down the first branch. A threshold that has stayed on a bin
+        boundary since the split is therefore scored exactly.
+
+        Parameters
+        ----------
+        criterion: VectorizedSplitCriterion
+            The splitting criterion to be used.
+        pre_split_dist: numpy.ndarray of shape (n_classes,)
+            Class distribution at the node.
+        split_test: NumericAttributeBinaryTest
+            Split to score.
+
+        Returns
+        -------
+        AttributeSplitSuggestion or None
+            Suggestion of `split_test`, None if its attribute is not observed.
+
+        """
+        row = self._rows.get(split_test.get_atts_test_depends_on()[0])
+        if row is None or not self._active[row]:
+            return None
+        num_classes = max(self.num_classes(), len(pre_split_dist))
+        counts = np.pad(self._counts[row].astype(float), ((0, 0), (0, num_classes - self.num_classes())))
+        pre_split_dists = np.zeros(num_classes)
+        pre_split_dists[:len(pre_split_dist)] = pre_split_dist
+        centers = self._low[row] + (np.arange(self.num_bins) + 0.5) * self._width[row]
+        lhs = counts[centers < split_test.get_split_value()].sum(axis=0)
+        post_split_dist = np.stack((lhs, counts.sum(axis=0) - lhs))
+        merit = criterion.get_merits_of_splits(pre_split_dists, post_split_dist[None])[0]
+        return AttributeSplitSuggestion(split_test, [post_split_dist[0], post_split_dist[1]], merit)
+
+
+class NominalCountObserver(AttributeClassObserver):
+    """ Class distributions of the values of a nominal attribute, stored in a dense (values x classes) matrix.
+
+    Drop-in replacement for `NominalAttributeClassObserver`. Rows are allocated in the order values are first seen,
+    the matrix doubling its capacity when it is full. The row after the last value is always allocated and empty, it
+    stands for unseen values. The weight and the number of values of each class are kept up to date, so that Naive
+    Bayes probabilities are read without reductions. Split suggestions are ordered by value, and all the binary splits
+    are scored in a single batch.
+
+    Parameters
+    ----------
+    capacity: int (default=8)
+        Number of values the matrix is initially allocated for.
+
+    dtype: numpy.dtype (default=numpy.float64)
+        Type of the stored weights. Split evaluations are computed in double precision.
+
+    """
+
+    def __init__(self, capacity=8, dtype=np.float64):
+        super().__init__()
+        self._total_weight_observed = 0.0
+        self._missing_weight_observed = 0.0
+        self._value_rows = {}
+        self._values = np.zeros(capacity)
+        self._counts = np.zeros((capacity, 0), dtype=dtype)
+        self._class_weights = np.zeros(0)
+        self._class_num_values = np.zeros(0)
+
+    def num_values(self):
+        return len(self._value_rows)
+
+    def num_classes(self):
+        return self._counts.shape[1]
+
+    def _grow(self, num_values, num_classes):
+        capacity = max(len(self._values), 1)
+        while capacity < num_values:
+            capacity *= 2
+        values = np.zeros(capacity)
+        values[:len(self._values)] = self._values
+        counts = np.zeros((capacity, num_classes), dtype=self._counts.dtype)
+        counts[:len(self._counts), :self.num_classes()] = self._counts
+        class_weights = np.zeros(num_classes)
+        class_weights[:self.num_classes()] = self._class_weights
+        class_num_values = np.zeros(num_classes)
+        class_num_values[:self.num_classes()] = self._class_num_values
+        self._values, self._counts = values, counts
+        self._class_weights, self._class_num_values = class_weights, class_num_values
+
+    def _update_class_totals(self):
+        counts = self._counts[:self.num_values()]
+        self._class_weights = counts.sum(axis=0, dtype=float)
+        self._class_num_values = np.count_nonzero(counts, axis=0).astype(float)
+
+    def _row(self, att_val):
+        row = self._value_rows.get(att_val)
+        if row is None:
+            row = len(self._value_rows)
+            if row + 1 >= len(self._values):
+                self._grow(row + 2, self.num_classes())
+            self._value_rows[att_val] = row
+            self._values[row] = att_val
+        return row
+
+    def observe_attribute_class(self, att_val, class_val, weight):
+        if att_val is None or att_val != att_val:
+            self._missing_weight_observed += weight
+        else:
+            row = self._row(att_val)
+            if class_val >= self.num_classes():
+                self._grow(len(self._values), class_val + 1)
+            if self._counts[row, class_val] == 0.0 and weight > 0.0:
+                self._class_num_values[class_val] += 1.0
+            self._counts[row, class_val] += weight
+            self._class_weights[class_val] += weight
+        self._total_weight_observed += weight
+
+    def observe_batch(self, att_vals, y, weight):
+        """ Update the class distributions with the values of a batch of instances.
+
+        Parameters
+        ----------
+        att_vals: numpy.ndarray of shape (n_samples,)
+            Attribute values, NaN for missing values.
+        y: numpy.ndarray of int of shape (n_samples,)
+            Instances classes.
+        weight: numpy.ndarray of shape (n_samples,)
+            Instances weights.
+
+        """
+        att_vals = np.asarray(att_vals, dtype=float)
+        observed = ~np.isnan(att_vals)
+        self._total_weight_observed += weight.sum()
+        self._missing_weight_observed += weight[~observed].sum()
+        num_classes = max(self.num_classes(), y.max() + 1)
+        if num_classes > self.num_classes():
+            self._grow(len(self._values), num_classes)
+        rows = [self._row(att_val) for att_val in att_vals[observed].tolist()]
+        np.add.at(self._counts, (rows, y[observed]), weight[observed])
+        self._update_class_totals()
+
+    def probability_of_attribute_value_given_class(self, att_val, class_val):
+        # rows are looked up before the arrays are read, since new rows are only added once the arrays have grown
+        row = self._value_rows.get(att_val, self.num_values())
+        counts, class_weights, class_num_values = self._counts, self._class_weights, self._class_num_values
+        if class_val >= min(counts.shape[1], len(class_weights), len(class_num_values)) \
+                or class_num_values[class_val] == 0.0:
+            return 0.0
+        return (counts[row, class_val] + 1.0) / (class_weights[class_val] + class_num_values[class_val])
+
+    def class_probabilities(self, att_vals):
+        """ Compute `probability_of_attribute_value_given_class` for several values and all the classes at once.
+
+        Parameters
+        ----------
+        att_vals: list or numpy.ndarray of length n_samples
+            Attribute values.
+
+        Returns
+        -------
+        numpy.ndarray of shape (n_samples, n_classes)
+            Probabilities, 0 for classes that were not observed.
+
+        """
+        # see probability_of_attribute_value_given_class
+        rows = [self._value_rows.get(att_val, self.num_values()) for att_val in att_vals]
+        counts, class_weights, class_num_values = self._counts, self._class_weights, self._class_num_values
+        num_classes = min(counts.shape[1], len(class_weights), len(class_num_values))
+        observed = class_num_values[:num_classes] > 0.0
+        denominators = np.where(observed, class_weights[:num_classes] + class_num_values[:num_classes], 1.0)
+        return np.where(observed, (counts[rows, :num_classes] + 1.0) / denominators, 0.0)
+
+    def get_best_evaluated_split_suggestion(self, criterion, pre_split_dist, att_idx, binary_only):
+        """ Find the best split of the attribute, among the multiway split and the binary splits of each value.
+
+        The multiway split is kept unless a binary split has a strictly greater merit, and among binary splits of
+        equal merits the one of the smallest value is kept.
+
+        Parameters
+        ----------
+        criterion: VectorizedSplitCriterion
+            The splitting criterion to be used.
+        pre_split_dist: numpy.ndarray of shape (n_classes,)
+            Class distribution at the node.
+        att_idx: int
+            Index of the attribute.
+        binary_only: bool
+            If True, the multiway split is not considered.
+
+        Returns
+        -------
+        AttributeSplitSuggestion or None
+
+        """
+        order = np.argsort(self._values[:self.num_values()], kind='stable')
+        num_classes = max(self.num_classes(), len(pre_split_dist))
+        counts = np.pad(self._counts[order].astype(float), ((0, 0), (0, num_classes - self.num_classes())))
+        pre_split_dists = np.zeros(num_classes)
+        pre_split_dists[:len(pre_split_dist)] = pre_split_dist
+
+        best_suggestion = None
+        if not binary_only:
+            merit = criterion.get_merits_of_splits(pre_split_dists, counts[None])[0]
+            # the multiway test routes an instance to the branch of its value, unobserved values below the largest
+            # one get an empty distribution
+            values = self._values[order].astype(int)
+            resulting_dists = np.zeros((values[-1] + 1 if len(values) else 0, num_classes))
+            resulting_dists[values] = counts
+            best_suggestion = AttributeSplitSuggestion(NominalAttributeMultiwayTest(att_idx), list(resulting_dists),
+                                                       merit)
+        if len(counts) == 0:
+            return best_suggestion
+        # Class distributions of the values equal to and different from each value, shape (values, 2, classes)
+        post_split_dists = np.stack((counts, counts.sum(axis=0) - counts), axis=1)
+        merits = criterion.get_merits_of_splits(pre_split_dists, post_split_dists)
+        best = int(np.argmax(merits))
+        if best_suggestion is None or merits[best] > best_suggestion.merit:
+            best_suggestion = AttributeSplitSuggestion(
+                NominalAttributeBinaryTest(att_idx, self._values[order[best]]),
+                [post_split_dists[best, 0], post_split_dists[best, 1]], merits[best])
+        return best_suggestion
+
+    def get_split_suggestion(self, criterion, pre_split_dist, split_test):
+        """ Score a given split of the attribute, such as the one installed at an internal node.
+
+        Parameters
+        ----------
+        criterion: VectorizedSplitCriterion
+            The splitting criterion to be used.
+        pre_split_dist: numpy.ndarray of shape (n_classes,)
+            Class distribution at the node.
+        split_test: NominalAttributeBinaryTest or NominalAttributeMultiwayTest
+            Split to score.
+
+        Returns
+        -------
+        AttributeSplitSuggestion
+
+        """
+        num_classes = max(self.num_classes(), len(pre_split_dist))
+        counts = np.pad(self._counts[:self.num_values()].astype(float), ((0, 0), (0, num_classes - self.num_classes())))
+        pre_split_dists = np.zeros(num_classes)
+        pre_split_dists[:len(pre_split_dist)] = pre_split_dist
+        if isinstance(split_test, NominalAttributeBinaryTest):
+            equal = self._values[:self.num_values()] == split_test._att_value
+            post_split_dists = np.stack((counts[equal].sum(axis=0), counts[~equal].sum(axis=0)))
+            merit = criterion.get_merits_of_splits(pre_split_dists, post_split_dists[None])[0]
+            return AttributeSplitSuggestion(split_test, list(post_split_dists), merit)
+        merit = criterion.get_merits_of_splits(pre_split_dists, counts[None])[0]
+        values = self._values[:self.num_values()].astype(int)
+        resulting_dists = np.zeros((values.max() + 1 if len(values) else 0, num_classes))
+        resulting_dists[values] = counts
+        return AttributeSplitSuggestion(split_test, list(resulting_dists), merit)
+
+    def merge(self, others):
+        """ Add the class distributions of other observers of the same attribute to the ones of this observer.
+
+        Parameters
+        ----------
+        others: list of NominalCountObserver
+            Observers to merge into this one.
+
+        """
+        for other in others:
+            self._total_weight_observed += other._total_weight_observed
+            self._missing_weight_observed += other._missing_weight_observed
+            rows = np.array([self._row(value) for value in other._value_rows], dtype=int)
+            num_classes = max(self.num_classes(), other.num_classes())
+            if num_classes > self.num_classes():
+                self._grow(len(self._values), num_classes)
+            self._counts[rows, :other.num_classes()] += other._counts[:other.num_values()]
+        self._update_class_totals()
+
+    def get_arrays(self):
+        """ Get the state of the observer as a dict of arrays, scalars being 0-d arrays. """
+        return {'num_values': np.array(self.num_values()), 'values': self._values, 'counts': self._counts,
+                'class_weights': self._class_weights, 'class_num_values': self._class_num_values,
+                'total_weight_observed': np.array(self._total_weight_observed),
+                'missing_weight_observed': np.array(self._missing_weight_observed)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ Rebuild an observer from the arrays of `get_arrays`, which are used without copy. """
+        observer = cls(0, arrays['counts'].dtype)
+        observer._values = arrays['values']
+        observer._counts = arrays['counts']
+        observer._class_weights = arrays['class_weights']
+        observer._class_num_values = arrays['class_num_values']
+        values = observer._values[:int(arrays['num_values'])].tolist()
+        observer._value_rows = {value: row for row, value in enumerate(values)}
+        observer._total_weight_observed = float(arrays['total_weight_observed'])
+        observer._missing_weight_observed = float(arrays['missing_weight_observed'])
+        return observer
@@ -0,0 +1,180 @@
+import io
+import zlib
+
+import numpy as np
+
+from snapshot import flatten_nodes, read_record, restore_nodes, tree_params, write_record
+
+
+CHANGE_MAGIC = b'HATTCHNG'
+
+# Kinds of change records
+SNAPSHOT_CHANGE = 'snapshot'
+SUBTREE_CHANGE = 'subtree'
+UPDATE_CHANGE = 'update'
+
+
+class ChangeLog(object):
+    """ Ordered stream of the changes of a tree, for the replicas that only use it for inference.
+
+    Each change is a compressed record, in the snapshot record layout, passed to `sink` as bytes. Records are numbered,
+    and hold the class labels of the tree along with nodes saved with `flatten_nodes(..., inference_only=True)`:
+
+    - 'snapshot' - The whole tree and its parameters, published when the log starts and by `publish_snapshot`.
+    - 'subtree' - A node that replaced the root or a child of another node, and its children. Published by the tree
+      as soon as the structure changes: splits, resplits, unsplits, deactivations, activations and collapses.
+    - 'update' - The nodes whose statistics changed since the last update, published every `leaf_update_period`
+      training weight and by `publish_updates`.
+
+    Parameters
+    ----------
+    ht: HATT
+        Tree to follow.
+    sink: callable
+        Called with each record.
+    leaf_update_period: float or None
+        Training weight between updates, None to only publish them on demand.
+
+    """
+
+    def __init__(self, ht, sink, leaf_update_period):
+        self.ht = ht
+        self.sink = sink
+        self.leaf_update_period = leaf_update_period
+        self.sequence = 0
+        # Nodes updated since the last update record, by node_id
+        self.dirty_nodes = {}
+
+    def publish_snapshot(self):
+        """ Publish the whole tree, from which followers can start. """
+        ht = self.ht
+        header = {'params': tree_params(ht), 'root': None}
+        arrays = {}
+        if ht._tree_root is not None:
+            header['root'] = ht._tree_root.node_id
+            flatten_nodes(ht, [found_node.node for found_node in ht._find_nodes()], arrays, inference_only=True)
+        self.dirty_nodes = {}
+        self._publish(SNAPSHOT_CHANGE, header, arrays)
+
+    def publish_subtree(self, parent, parent_branch, node):
+        """ Publish a node that replaced the root, when `parent` is None, or a child of `parent`. """
+        nodes = [node]
+        if isinstance(node, self.ht.SplitNode):
+            nodes.extend(child for child in node._children.values() if child is not None)
+        header = {'parent': parent.node_id if parent is not None else None, 'branch': int(parent_branch)}
+        arrays = {}
+        flatten_nodes(self.ht, nodes, arrays, inference_only=True)
+        self._publish(SUBTREE_CHANGE, header, arrays)
+
+    def publish_updates(self):
+        """ Publish the nodes updated since the last update, if any. """
+        if not self.dirty_nodes:
+            return
+        arrays = {}
+        flatten_nodes(self.ht, list(self.dirty_nodes.values()), arrays, inference_only=True)
+        self.dirty_nodes = {}
+        self._publish(UPDATE_CHANGE, {}, arrays)
+
+    def _publish(self, change, header, arrays):
+        self.sequence += 1
+        header = dict(header, change=change, sequence=self.sequence)
+        if self.ht._class_labels:
+            arrays['class_labels'] = np.asarray(self.ht._class_labels)
+        buffer = io.BytesIO()
+        write_record(buffer, 0, CHANGE_MAGIC, header, arrays)
+        self.sink(zlib.compress(buffer.getvalue(), 1))
+
+
+class TreeReplica(object):
+    """ Inference-only copy of a tree, kept in sync with the records of its `ChangeLog`.
+
+    The replica starts from a 'snapshot' record, then applies the other records in order. Nodes are identified by
+    their `node_id`: updates of nodes that have been replaced since are ignored. The replicated tree predicts as the
+    followed one did when the last applied record was published, but should not be trained, since its internal nodes
+    keep no observers.
+
+    Parameters
+    ----------
+    tree_class: type
+        `HATT` or the subclass of the followed tree.
+
+    """
+
+    def __init__(self, tree_class):
+        self.tree_class = tree_class
+        self.tree = None
+        self.sequence = None
+        self._nodes_by_id = {}
+        # Parent node_id (None for the root) and branch of each node, by node_id
+        self._parents = {}
+
+    def apply(self, record):
+        """ Apply a record published by a `ChangeLog`.
+
+        Raises a ValueError if records are missing since the last applied one. The replica then waits for a new
+        snapshot, see `ChangeLog.publish_snapshot`.
+
+        """
+        header, arrays, _ = read_record(bytearray(zlib.decompress(record)), 0, CHANGE_MAGIC)
+        if header['change'] == SNAPSHOT_CHANGE:
+            self.tree = self.tree_class(**header['params'])
+            self._nodes_by_id = {}
+            self._parents = {}
+        elif self.tree is None or header['sequence'] != self.sequence + 1:
+            self.tree = None
+            raise ValueError('Change record {} does not follow record {}, the replica needs a new snapshot'.format(
+                header['sequence'], self.sequence))
+        self.sequence = header['sequence']
+        if 'class_labels' in arrays:
+            for label in arrays['class_labels'].tolist():
+                self.tree._register_class(label)
+        nodes = restore_nodes(self.tree, arrays) if 'node_ids' in arrays else []
+
+        if header['change'] == SNAPSHOT_CHANGE:
+            self._nodes_by_id = {node.node_id: node for node in nodes}
+            if header['root'] is not None:
+                self._attach(None, -1, self._nodes_by_id[header['root']])
+        elif header['change'] == SUBTREE_CHANGE:
+            parent_id = header['parent']
+            if parent_id is None or parent_id in self._nodes_by_id:
+                replaced = self.tree._tree_root if parent_id is None else \
+                    self._nodes_by_id[parent_id].get_child(header['branch'])
+                if replaced is not None:
+                    self._forget_subtree(replaced)
+                self._nodes_by_id.update((node.node_id, node) for node in nodes)
+                self._attach(parent_id, header['branch'], nodes[0])
+        else:
+            for node in nodes:
+                if node.node_id in self._parents:
+                    self._nodes_by_id[node.node_id] = node
+                    self._attach(*self._parents[node.node_id], node)
+        self.tree._compiled_tree = None
+
+    def predict(self, X):
+        return self.tree.predict(X)
+
+    def predict_proba(self, X):
+        return self.tree.predict_proba(X)
+
+    def _attach(self, parent_id, branch, node):
+        """ Put a node in the tree and link its children, given as node ids or as outdated nodes. """
+        if parent_id is None:
+            self.tree._tree_root = node
+        else:
+            self._nodes_by_id[parent_id].set_child(branch, node)
+        self._parents[node.node_id] = (parent_id, branch)
+        if isinstance(node, self.tree.SplitNode):
+            for child_branch, child in node._children.items():
+                child = self._nodes_by_id[child if isinstance(child, int) else child.node_id]
+                node._children[child_branch] = child
+                if self._parents.get(child.node_id) != (node.node_id, child_branch):
+                    self._attach(node.node_id, child_branch, child)
+
+    def _forget_subtree(self, node):
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            self._nodes_by_id.pop(node.node_id, None)
+            self._parents.pop(node.node_id, None)
+            if isinstance(node, self.tree.SplitNode):
+                pending.extend(child for child in node._children.values() if child is not None)
@@ -0,0 +1,640 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import uuid
+
+import numpy as np
+
+from skmultiflow.trees.nominal_attribute_binary_test import NominalAttributeBinaryTest
+from skmultiflow.trees.nominal_attribute_multiway_test import NominalAttributeMultiwayTest
+from skmultiflow.trees.numeric_attribute_binary_test import NumericAttributeBinaryTest
+
+from inference import (compile_split_test, GENERIC_TEST, LEAF, NUMERIC_BINARY_TEST, NOMINAL_BINARY_TEST,
+                       NOMINAL_MULTIWAY_TEST)
+from observers import GaussianObserverStore, HistogramObserverStore, NominalCountObserver
+
+
+SNAPSHOT_MAGIC = b'HATTSNAP'
+DELTA_MAGIC = b'HATTDLTA'
+SNAPSHOT_VERSION = 2
+DELTAS_SUFFIX = '.deltas'
+# Arrays start at offsets multiple of this many bytes
+ARRAY_ALIGNMENT = 64
+# Magic, format version and size of the JSON header
+PREAMBLE = struct.Struct('<8sIQ')
+
+# Types of learning nodes
+INACTIVE_NODE = 0
+MAJORITY_CLASS_NODE = 1
+NAIVE_BAYES_NODE = 2
+NAIVE_BAYES_ADAPTIVE_NODE = 3
+
+# Store types of the numeric observers, indexed by their code in a snapshot
+NUMERIC_STORES = (GaussianObserverStore, HistogramObserverStore)
+
+# Attributes of the tree saved in the header
+TREE_STATE = ('_decision_node_cnt', '_active_leaf_node_cnt', '_inactive_leaf_node_cnt',
+              '_inactive_leaf_byte_size_estimate', '_active_leaf_byte_size_estimate',
+              '_byte_size_estimate_overhead_fraction', '_growth_allowed', '_train_weight_seen_by_model',
+              '_internal_node_byte_size_estimate', '_splits_at_last_estimate', '_reevaluation_sequence',
+              'number_of_splits', 'number_of_resplits', 'number_of_unsplits', 'number_of_rebuilds_avoided',
+              'rebuild_nodes_avoided', 'number_of_collapses', 'collapsed_nodes', '_next_node_id')
+
+
+def write_snapshot(path, header, arrays):
+    """ Write a JSON header and named arrays to a snapshot file.
+
+    The file starts with `PREAMBLE`, followed by the header, which lists the type, shape and offset of each array.
+    Arrays are stored in C order, at offsets aligned on `ARRAY_ALIGNMENT`, so that they can be mapped in memory as is.
+    The file is written next to `path` and then moved over it, which leaves trees mapped from a previous snapshot at
+    the same path valid.
+
+    Parameters
+    ----------
+    path: str
+        Path of the snapshot file.
+    header: dict
+        JSON serializable metadata. NumPy scalars and dtypes are converted.
+    arrays: dict
+        Arrays by name. Object arrays are not supported.
+
+    """
+    temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(temporary_path, 'wb') as f:
+            f.truncate(write_record(f, 0, SNAPSHOT_MAGIC, header, arrays))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def read_snapshot(path, memory_map=True):
+    """ Read the header and the arrays of a snapshot file.
+
+    Parameters
+    ----------
+    path: str
+        Path of the snapshot file.
+    memory_map: boolean (default=True)
+        If True, the file is mapped in memory copy-on-write: arrays are views of the file pages, which are only read
+        when accessed and shared between the processes mapping the file, until written to. Otherwise the file is read
+        at once into a private buffer.
+
+    Returns
+    -------
+    tuple (dict, dict)
+        The header and the writable arrays, by name.
+
+    """
+    with open(path, 'rb') as f:
+        if memory_map:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            buffer = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(buffer)
+    try:
+        header, arrays, _ = read_record(buffer, 0, SNAPSHOT_MAGIC)
+    except ValueError as error:
+        raise ValueError('{}: {}'.format(path, error))
+    return header, arrays
+
+
+def write_record(f, start, magic, header, arrays):
+    """ Write a header and arrays, in the snapshot file layout, at position `start` of a binary file.
+
+    `start` must be a multiple of `ARRAY_ALIGNMENT` for the arrays to be aligned in the file.
+
+    Returns
+    -------
+    int
+        Position of the end of the record.
+
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    table = {}
+    end = 0
+    for name, array in arrays.items():
+        if array.dtype.hasobject:
+            raise ValueError("Array '{}' of dtype object cannot be saved in a snapshot".format(name))
+        offset = _aligned(end)
+        table[name] = [array.dtype.str, list(array.shape), offset]
+        end = offset + array.nbytes
+    encoded = json.dumps(dict(header, arrays=table), default=_json_default).encode('utf-8')
+    data_start = start + _aligned(PREAMBLE.size + len(encoded))
+    f.seek(start)
+    f.write(PREAMBLE.pack(magic, SNAPSHOT_VERSION, len(encoded)))
+    f.write(encoded)
+    for name, array in arrays.items():
+        f.seek(data_start + table[name][2])
+        f.write(array.reshape(-1).view(np.uint8).data)
+    return data_start + end
+
+
+def read_record(buffer, start, magic):
+    """ Read the record written by `write_record` at position `start` of a buffer.
+
+    Arrays are views of the buffer. Raises a ValueError if the record is not complete or not of the expected kind.
+
+    Returns
+    -------
+    tuple (dict, dict, int)
+        The header, the arrays by name, and the position of the end of the record.
+
+    """
+    if len(buffer) - start < PREAMBLE.size:
+        raise ValueError('truncated record')
+    record_magic, version, header_size = PREAMBLE.unpack_from(buffer, start)
+    if record_magic != magic:
+        raise ValueError('not a HATT {}'.format('snapshot' if magic == SNAPSHOT_MAGIC else 'delta checkpoint'))
+    if version != SNAPSHOT_VERSION:
+        raise ValueError('format version {}, only version {} is supported'.format(version, SNAPSHOT_VERSION))
+    header_start = start + PREAMBLE.size
+    if header_start + header_size > len(buffer):
+        raise ValueError('truncated record')
+    header = json.loads(bytes(buffer[header_start:header_start + header_size]).decode('utf-8'))
+    data_start = start + _aligned(PREAMBLE.size + header_size)
+    arrays = {}
+    end = data_start
+    for name, (dtype, shape, offset) in header.pop('arrays').items():
+        dtype = np.dtype(dtype)
+        count = math.prod(shape)
+        end = max(end, data_start + offset + count * dtype.itemsize)
+        if end > len(buffer):
+            raise ValueError('truncated record')
+        arrays[name] = np.frombuffer(buffer, dtype, count, data_start + offset).reshape(shape)
+    return header, arrays, end
+
+
+def pack_segments(arrays, name, segments):
+    """ Concatenate arrays of the same type and number of dimensions, but of different shapes, into `arrays`.
+
+    The flattened segments are stored under `name`, and their shapes under `name + '.shapes'`.
+
+    """
+    ndim = segments[0].ndim if segments else 1
+    arrays[name] = np.concatenate([segment.reshape(-1) for segment in segments]) if segments else np.zeros(0)
+    shapes = np.array([segment.shape for segment in segments], dtype=np.int64)
+    arrays[name + '.shapes'] = shapes.reshape(len(segments), ndim)
+
+
+def unpack_segments(arrays, name):
+    """ Split the arrays packed by `pack_segments` into views of the stored one. """
+    data = arrays[name]
+    shapes = arrays[name + '.shapes']
+    ends = np.cumsum(np.prod(shapes, axis=1)).tolist()
+    starts = [0] + ends[:-1]
+    return [data[start:end].reshape(shape) for start, end, shape in zip(starts, ends, shapes.tolist())]
+
+
+def pack_states(arrays, name, states):
+    """ Pack the dicts of arrays returned by the `get_arrays` methods of observers, see `pack_segments`. """
+    fields = states[0].keys() if states else []
+    for field in fields:
+        pack_segments(arrays, '{}/{}'.format(name, field), [state[field] for state in states])
+
+
+def unpack_states(arrays, name):
+    """ Get back the dicts of arrays packed by `pack_states`. """
+    prefix = name + '/'
+    fields = [key[len(prefix):] for key in arrays if key.startswith(prefix) and not key.endswith('.shapes')]
+    columns = [unpack_segments(arrays, prefix + field) for field in fields]
+    return [dict(zip(fields, values)) for values in zip(*columns)]
+
+
+def save_tree(ht, path, checkpoint=None):
+    """ Save a Hoeffding Anytime Tree to a snapshot file.
+
+    The snapshot holds the parameters of the tree, its counters, its class labels and random state, and all its nodes
+    flattened into arrays: one entry per node, the root first, for the split test, the `node_id` of the children and
+    the scalar statistics, and the class distributions and observer statistics of all the nodes concatenated per field.
+    Cached split suggestions are not saved, they are evaluated again when needed.
+
+    Parameters
+    ----------
+    ht: HATT
+        The tree to save. Trees using a custom `numeric_observer` cannot be saved.
+    path: str
+        Path of the snapshot file.
+    checkpoint: str or None (default=None)
+        Token identifying the snapshot as the base of the delta checkpoints written by `checkpoint_tree`.
+
+    """
+    arrays = {}
+    header = _tree_header(ht, arrays)
+    header['params'] = tree_params(ht)
+    header['shared_random_state'] = isinstance(ht.random_state, np.random.RandomState)
+    header['checkpoint'] = checkpoint
+    header['root'] = ht._tree_root.node_id if ht._tree_root is not None else None
+    if ht._tree_root is not None:
+        flatten_nodes(ht, [found_node.node for found_node in ht._find_nodes()], arrays)
+    write_snapshot(path, header, arrays)
+
+
+def load_tree(cls, path, memory_map=True):
+    """ Load a Hoeffding Anytime Tree saved by `save_tree`.
+
+    Parameters
+    ----------
+    cls: type
+        `HATT` or a subclass, built with the saved parameters.
+    path: str
+        Path of the snapshot file.
+    memory_map: boolean (default=True)
+        If True, the statistics of the nodes are views of the file mapped in memory, see `read_snapshot`.
+
+    Returns
+    -------
+    HATT
+        The restored tree, ready to predict and to keep learning.
+
+    """
+    header, arrays = read_snapshot(path, memory_map)
+    ht, nodes_by_id = _restore_snapshot(cls, header, arrays)
+    if nodes_by_id:
+        ht._tree_root = _link_nodes(ht, nodes_by_id, header['root'], arrays)
+    return ht
+
+
+def checkpoint_tree(ht, path, compaction_ratio=1.0):
+    """ Write a checkpoint of a tree: a full snapshot, or the nodes that changed since the last checkpoint.
+
+    The first checkpoint to a path is a snapshot. The tree then records the nodes it updates, and each checkpoint
+    appends them, along with the counters of the tree, to the delta file `path + DELTAS_SUFFIX`. Once the delta file is
+    larger than `compaction_ratio` times the snapshot, the next checkpoint compacts both into a new snapshot.
+
+    Records are tagged with a token of their snapshot, so that the deltas left by a compaction that did not complete
+    are ignored by `recover_tree`.
+
+    Parameters
+    ----------
+    ht: HATT
+        The tree to save.
+    path: str
+        Path of the snapshot file.
+    compaction_ratio: float (default=1.0)
+        Size of the delta file, relative to the snapshot, above which the next checkpoint is a snapshot.
+
+    """
+    state = ht._checkpoint
+    deltas_path = path + DELTAS_SUFFIX
+    if (state is None or state['path'] != path or ht._dirty_nodes is None
+            or state['deltas_size'] > compaction_ratio * state['snapshot_size']):
+        token = uuid.uuid4().hex
+        save_tree(ht, path, token)
+        if os.path.exists(deltas_path):
+            os.remove(deltas_path)
+        ht._checkpoint = {'path': path, 'token': token, 'sequence': 0, 'snapshot_size': os.path.getsize(path),
+                          'deltas_size': 0}
+    else:
+        arrays = {}
+        header = _tree_header(ht, arrays)
+        header.update(base=state['token'], sequence=state['sequence'] + 1,
+                      root=ht._tree_root.node_id if ht._tree_root is not None else None)
+        flatten_nodes(ht, list(ht._dirty_nodes.values()), arrays)
+        with open(deltas_path, 'r+b' if os.path.exists(deltas_path) else 'wb') as f:
+            # anything after the last complete record is dropped
+            end = write_record(f, state['deltas_size'], DELTA_MAGIC, header, arrays)
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        state['sequence'] += 1
+        state['deltas_size'] = _aligned(end)
+    ht._dirty_nodes = {}
+
+
+def recover_tree(cls, path, memory_map=True):
+    """ Restore a tree from its last checkpoint, replaying the delta file of its snapshot.
+
+    Replay stops at the first record that is incomplete, or that does not follow the previous one. The returned tree
+    keeps checkpointing to the same files, the next delta overwriting what follows the last replayed record.
+
+    Parameters
+    ----------
+    cls: type
+        `HATT` or a subclass, built with the saved parameters.
+    path: str
+        Path of the snapshot file.
+    memory_map: boolean (default=True)
+        If True, the statistics of the nodes of the snapshot are views of the file mapped in memory.
+
+    Returns
+    -------
+    HATT
+        The restored tree.
+
+    """
+    header, arrays = read_snapshot(path, memory_map)
+    ht, nodes_by_id = _restore_snapshot(cls, header, arrays)
+    root_id = header['root']
+    token = header.get('checkpoint')
+    sequence = 0
+    deltas_size = 0
+    deltas_path = path + DELTAS_SUFFIX
+    if token is not None and os.path.exists(deltas_path):
+        with open(deltas_path, 'rb') as f:
+            buffer = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(buffer)
+        while deltas_size < len(buffer):
+            try:
+                delta_header, delta_arrays, end = read_record(buffer, deltas_size, DELTA_MAGIC)
+            except ValueError:
+                break
+            if delta_header['base'] != token or delta_header['sequence'] != sequence + 1:
+                break
+            _restore_tree_state(ht, delta_header, delta_arrays)
+            if 'node_ids' in delta_arrays:
+                nodes_by_id.update((node.node_id, node) for node in restore_nodes(ht, delta_arrays))
+            root_id = delta_header['root']
+            arrays = delta_arrays
+            sequence += 1
+            deltas_size = _aligned(end)
+    if root_id is not None:
+        ht._tree_root = _link_nodes(ht, nodes_by_id, root_id, arrays)
+    if token is not None:
+        ht._dirty_nodes = {}
+        ht._checkpoint = {'path': path, 'token': token, 'sequence': sequence, 'snapshot_size': os.path.getsize(path),
+                          'deltas_size': deltas_size}
+    return ht
+
+
+def tree_params(ht):
+    """ Get the parameters of a tree, as saved in a snapshot header.
+
+    A `random_state` given as a RandomState instance is saved as None, its state being saved apart.
+
+    """
+    params = ht.get_params(deep=False)
+    if callable(params['numeric_observer']):
+        raise ValueError('Trees with a custom numeric_observer cannot be saved')
+    if isinstance(params['random_state'], np.random.RandomState):
+        params['random_state'] = None
+    return params
+
+
+def _tree_header(ht, arrays):
+    """ Get the header of the tree state saved by snapshots and deltas, storing its arrays in `arrays`. """
+    header = {'state': {name: getattr(ht, name) for name in TREE_STATE}, 'random_state': None}
+    # the global random state is left to the loading process
+    if ht._random_state is not np.random.mtrand._rand:
+        kind, keys, position, has_gauss, cached_gaussian = ht._random_state.get_state()
+        header['random_state'] = [kind, position, has_gauss, cached_gaussian]
+        arrays['random_state'] = keys
+    if ht._class_labels:
+        arrays['class_labels'] = np.asarray(ht._class_labels)
+    if ht.classes is not None:
+        arrays['classes'] = np.asarray(ht.classes)
+    queue = [entry for entry in ht._reevaluation_queue if not entry[2]._detached]
+    arrays['queue_nodes'] = np.array([entry[2].node_id for entry in queue], dtype=np.int64)
+    arrays['queue_priorities'] = np.array([entry[0] for entry in queue], dtype=float).reshape(-1, 2)
+    arrays['queue_sequences'] = np.array([entry[1] for entry in queue], dtype=np.int64)
+    return header
+
+
+def _restore_tree_state(ht, header, arrays):
+    for name, value in header['state'].items():
+        setattr(ht, name, value)
+    if header['random_state'] is not None:
+        kind, position, has_gauss, cached_gaussian = header['random_state']
+        ht._random_state = np.random.RandomState()
+        ht._random_state.set_state((kind, arrays['random_state'], position, has_gauss, cached_gaussian))
+        if header.get('shared_random_state', False):
+            ht.random_state = ht._random_state
+    if 'classes' in arrays:
+        ht.classes = arrays['classes'].tolist()
+    if 'class_labels' in arrays:
+        for label in arrays['class_labels'].tolist():
+            ht._register_class(label)
+
+
+def _restore_snapshot(cls, header, arrays):
+    """ Build the tree of a snapshot and its nodes by `node_id`, the children of split nodes being left unlinked. """
+    ht = cls(**header['params'])
+    _restore_tree_state(ht, header, arrays)
+    if 'kinds' not in arrays:
+        return ht, {}
+    return ht, {node.node_id: node for node in restore_nodes(ht, arrays)}
+
+
+def _link_nodes(ht, nodes_by_id, root_id, arrays):
+    """ Link the split nodes reachable from the root to the last restored version of their children.
+
+    The re-evaluation queue saved in `arrays` is rebuilt, since its entries refer to the parent of their node.
+
+    Returns
+    -------
+    Node
+        The root.
+
+    """
+    root = nodes_by_id[root_id]
+    parents = {root_id: (None, -1)}
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ht.HattSplitNode):
+            for branch, child in node._children.items():
+                # children are node ids, or nodes that a later delta may have replaced
+                child_id = child if isinstance(child, int) else child.node_id
+                child = nodes_by_id[child_id]
+                node._children[branch] = child
+                parents[child_id] = (node, branch)
+                pending.append(child)
+    ht._reevaluation_queue = [(tuple(priority), sequence, nodes_by_id[node_id]) + parents[node_id]
+                              for node_id, priority, sequence in zip(arrays['queue_nodes'].tolist(),
+                                                                     arrays['queue_priorities'].tolist(),
+                                                                     arrays['queue_sequences'].tolist())
+                              if node_id in parents]
+    heapq.heapify(ht._reevaluation_queue)
+    return root
+
+
+def flatten_nodes(ht, nodes, arrays, inference_only=False):
+    """ Store the state of a list of nodes in `arrays`, children being referred to by their `node_id`.
+
+    With `inference_only`, the learning nodes of split nodes are saved as inactive learning nodes, and only the leaves
+    that vote with Naive Bayes keep their observers.
+
+    """
+    split_nodes = [node if isinstance(node, ht.HattSplitNode) else None for node in nodes]
+    split_tests = [compile_split_test(node._split_test) if node else (LEAF, -1, 0.0, 0) for node in split_nodes]
+    if any(kind == GENERIC_TEST for kind, _, _, _ in split_tests):
+        raise ValueError('Trees with split tests other than the numeric binary and nominal tests cannot be saved')
+    arrays['node_ids'] = np.array([node.node_id for node in nodes], dtype=np.int64)
+    for i, name in enumerate(('kinds', 'features', 'thresholds', 'equal_branches')):
+        arrays[name] = np.array([split_test[i] for split_test in split_tests], dtype=float if i == 2 else np.int64)
+    child_offsets = []
+    num_branches = []
+    children = []
+    for node in split_nodes:
+        child_offsets.append(len(children))
+        branches = {int(branch): child.node_id for branch, child in node._children.items()
+                    if child is not None and branch >= 0} if node else {}
+        num_branches.append(max(branches, default=-1) + 1)
+        children.extend(branches.get(branch, -1) for branch in range(num_branches[-1]))
+    arrays['child_offsets'] = np.array(child_offsets, dtype=np.int64)
+    arrays['num_branches'] = np.array(num_branches, dtype=np.int64)
+    arrays['children'] = np.array(children, dtype=np.int64)
+    arrays['last_visit'] = np.array([getattr(node, 'last_visit', np.nan) for node in nodes], dtype=float)
+
+    # split nodes
+    arrays['depth'] = np.array([node.depth if node else 0 for node in split_nodes], dtype=np.int64)
+    arrays['subspace_offset'] = np.array([node._subspace_offset if node else 0 for node in split_nodes],
+                                         dtype=np.int64)
+    arrays['next_reevaluation_weight'] = np.array([node._next_reevaluation_weight if node else 0.0
+                                                   for node in split_nodes], dtype=float)
+    arrays['last_reevaluation_weight'] = np.array([node._last_reevaluation_weight if node else 0.0
+                                                   for node in split_nodes], dtype=float)
+    arrays['last_merit_gap'] = np.array([node._last_merit_gap if node else 0.0 for node in split_nodes], dtype=float)
+    arrays['previous_att_idx'] = np.array([-1 if node is None or node._previous_att_idx is None
+                                           else node._previous_att_idx for node in split_nodes], dtype=np.int64)
+    arrays['queued'] = np.array([node._queued if node else False for node in split_nodes], dtype=bool)
+
+    # learning nodes, those of split nodes included
+    learning_nodes = [node.learning_node if split_node else node for node, split_node in zip(nodes, split_nodes)]
+    node_types = [_learning_node_type(ht, node) for node in learning_nodes]
+    observed_nodes = learning_nodes
+    if inference_only:
+        node_types = [INACTIVE_NODE if split_node else node_type
+                      for node_type, split_node in zip(node_types, split_nodes)]
+        observed_nodes = [node if node_type in (NAIVE_BAYES_NODE, NAIVE_BAYES_ADAPTIVE_NODE) else None
+                          for node, node_type in zip(learning_nodes, node_types)]
+    arrays['learning_node_types'] = np.array(node_types, dtype=np.int8)
+    arrays['collapsed'] = np.array([getattr(node, 'collapsed', False) for node in learning_nodes], dtype=bool)
+    arrays['initial_weight'] = np.array([getattr(node, '_initial_weight', 0.0) for node in learning_nodes],
+                                        dtype=float)
+    arrays['weight_seen_at_last_split_evaluation'] = np.array(
+        [getattr(node, '_weight_seen_at_last_split_evaluation', 0.0) for node in learning_nodes], dtype=float)
+    arrays['mc_correct_weight'] = np.array([getattr(node, '_mc_correct_weight', 0.0) for node in learning_nodes],
+                                           dtype=float)
+    arrays['nb_correct_weight'] = np.array([getattr(node, '_nb_correct_weight', 0.0) for node in learning_nodes],
+                                           dtype=float)
+    pack_segments(arrays, 'distributions', [node._observed_class_distribution for node in learning_nodes])
+    pack_segments(arrays, 'cache_attributes', [np.array(list(getattr(node, '_split_suggestion_cache', {})),
+                                                        dtype=np.int64) for node in observed_nodes])
+
+    numeric_stores = [getattr(node, '_numeric_observers', None) for node in observed_nodes]
+    store_types = np.full(len(nodes), -1, dtype=np.int8)
+    for code, store_type in enumerate(NUMERIC_STORES):
+        found = [i for i, store in enumerate(numeric_stores) if type(store) is store_type]
+        store_types[found] = code
+        pack_states(arrays, 'numeric_{}'.format(code), [numeric_stores[i].get_arrays() for i in found])
+    arrays['numeric_store_types'] = store_types
+
+    nominal = [(i, att_idx, obs) for i, node in enumerate(observed_nodes)
+               for att_idx, obs in getattr(node, '_attribute_observers', {}).items()]
+    arrays['nominal_nodes'] = np.array([i for i, _, _ in nominal], dtype=np.int64)
+    arrays['nominal_attributes'] = np.array([att_idx for _, att_idx, _ in nominal], dtype=np.int64)
+    pack_states(arrays, 'nominal', [obs.get_arrays() for _, _, obs in nominal])
+
+
+def restore_nodes(ht, arrays):
+    """ Rebuild the nodes stored by `flatten_nodes`, the children of split nodes being left as node ids. """
+    store_types = arrays['numeric_store_types'].tolist()
+    stores = [[store_type.from_arrays(state) for state in unpack_states(arrays, 'numeric_{}'.format(code))]
+              for code, store_type in enumerate(NUMERIC_STORES)]
+    store_positions = [0] * len(NUMERIC_STORES)
+    cache_attributes = unpack_segments(arrays, 'cache_attributes')
+    learning_node_types = {INACTIVE_NODE: ht.HattInactiveLearningNode,
+                           MAJORITY_CLASS_NODE: ht.HattActiveLearningNode,
+                           NAIVE_BAYES_NODE: ht.HattLearningNodeNB,
+                           NAIVE_BAYES_ADAPTIVE_NODE: ht.HattLearningNodeNBAdaptive}
+
+    learning_nodes = []
+    for i, (node_type, dist) in enumerate(zip(arrays['learning_node_types'].tolist(),
+                                              unpack_segments(arrays, 'distributions'))):
+        node = learning_node_types[node_type](dist)
+        if node_type == INACTIVE_NODE:
+            if arrays['collapsed'][i]:
+                node.collapsed = True
+        else:
+            node._initial_weight = float(arrays['initial_weight'][i])
+            node._weight_seen_at_last_split_evaluation = float(arrays['weight_seen_at_last_split_evaluation'][i])
+            if store_types[i] >= 0:
+                node._numeric_observers = stores[store_types[i]][store_positions[store_types[i]]]
+                store_positions[store_types[i]] += 1
+            node._split_suggestion_cache = dict.fromkeys(cache_attributes[i].tolist())
+            if node_type == NAIVE_BAYES_ADAPTIVE_NODE:
+                node._mc_correct_weight = float(arrays['mc_correct_weight'][i])
+                node._nb_correct_weight = float(arrays['nb_correct_weight'][i])
+        learning_nodes.append(node)
+    for i, att_idx, state in zip(arrays['nominal_nodes'].tolist(), arrays['nominal_attributes'].tolist(),
+                                 unpack_states(arrays, 'nominal')):
+        learning_nodes[i]._attribute_observers[att_idx] = NominalCountObserver.from_arrays(state)
+
+    kinds = arrays['kinds'].tolist()
+    features = arrays['features'].tolist()
+    thresholds = arrays['thresholds'].tolist()
+    equal_branches = arrays['equal_branches'].tolist()
+    depths = arrays['depth'].tolist()
+    previous_att_indices = arrays['previous_att_idx'].tolist()
+    node_ids = arrays['node_ids'].tolist()
+    nodes = []
+    for i, learning_node in enumerate(learning_nodes):
+        split_test = _restore_split_test(kinds[i], features[i], thresholds[i], equal_branches[i])
+        if split_test is None:
+            node = learning_node
+        else:
+            node = ht.HattSplitNode(learning_node, split_test, learning_node.get_observed_class_distribution(),
+                                    depth=depths[i])
+            node._subspace_offset = int(arrays['subspace_offset'][i])
+            node._next_reevaluation_weight = float(arrays['next_reevaluation_weight'][i])
+            node._last_reevaluation_weight = float(arrays['last_reevaluation_weight'][i])
+            node._last_merit_gap = float(arrays['last_merit_gap'][i])
+            node._previous_att_idx = previous_att_indices[i] if previous_att_indices[i] >= 0 else None
+            node._queued = bool(arrays['queued'][i])
+        node.node_id = node_ids[i]
+        last_visit = float(arrays['last_visit'][i])
+        if not math.isnan(last_visit):
+            node.last_visit = last_visit
+        nodes.append(node)
+
+    # children are linked by _link_nodes
+    children = arrays['children'].tolist()
+    for node, offset, num_branches in zip(nodes, arrays['child_offsets'].tolist(), arrays['num_branches'].tolist()):
+        for branch in range(num_branches):
+            if children[offset + branch] >= 0:
+                node._children[branch] = children[offset + branch]
+    return nodes
+
+
+def _learning_node_type(ht, node):
+    if isinstance(node, ht.HattLearningNodeNBAdaptive):
+        return NAIVE_BAYES_ADAPTIVE_NODE
+    if isinstance(node, ht.HattLearningNodeNB):
+        return NAIVE_BAYES_NODE
+    if isinstance(node, ht.HattActiveLearningNode):
+        return MAJORITY_CLASS_NODE
+    if isinstance(node, ht.HattInactiveLearningNode):
+        return INACTIVE_NODE
+    raise ValueError('Learning nodes of type {} cannot be saved'.format(type(node).__name__))
+
+
+def _restore_split_test(kind, feature, threshold, equal_branch):
+    """ Rebuild the split test compiled by `inference.compile_split_test`, None for leaves. """
+    if kind == NUMERIC_BINARY_TEST:
+        return NumericAttributeBinaryTest(feature, threshold, equal_branch == 0)
+    if kind == NOMINAL_BINARY_TEST:
+        return NominalAttributeBinaryTest(feature, threshold)
+    if kind == NOMINAL_MULTIWAY_TEST:
+        return NominalAttributeMultiwayTest(feature)
+    return None
+
+
+def _aligned(offset):
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.dtype) or (isinstance(value, type) and issubclass(value, np.generic)):
+        return np.dtype(value).name
+    raise ValueError('{!r} cannot be saved in a snapshot header'.format(value))
@@ -0,0 +1,41 @@
+import numpy as np
+
+from hatt import HATT
+
+
+def test_batch_registers_classes_in_order_of_occurrence():
+    random_state = np.random.RandomState(0)
+    X = random_state.rand(50, 3)
+    y = np.array(['c', 'a', 'b'] * 16 + ['d', 'a'])
+    batch = HATT(leaf_prediction='mc', batch_learning=True).partial_fit(X, y)
+    sequential = HATT(leaf_prediction='mc').partial_fit(X, y)
+    assert batch._class_labels == sequential._class_labels == ['c', 'a', 'b', 'd']
+    np.testing.assert_allclose(batch.predict_proba(X), sequential.predict_proba(X))
+
+
+def nominal_tree(**kwargs):
+    """ Tree whose root splits on a nominal attribute holding the class. """
+    random_state = np.random.RandomState(0)
+    X = random_state.rand(1000, 2)
+    y = random_state.randint(3, size=1000)
+    X[:, 0] = y
+    ht = HATT(leaf_prediction='mc', nominal_attributes=[0], batch_learning=True, **kwargs).partial_fit(X, y)
+    assert ht._tree_root._split_test.get_atts_test_depends_on() == [0]
+    return ht
+
+
+def test_multiway_branches_of_non_integer_values():
+    ht = nominal_tree()
+    X = np.array([[0.0, 0.5], [2.0, 0.5], [1.5, 0.5], [np.nan, 0.5]])
+    np.testing.assert_array_equal(ht._tree_root.instance_child_indices(X), [0, 2, -1, -1])
+    np.testing.assert_array_equal(ht.get_compiled_tree().sort_instances(X) == 0, [False, False, True, True])
+    weights = [child.get_weight_seen() for child in ht._tree_root._children.values()]
+    ht.partial_fit(X[2:], np.array([1, 1]))
+    assert [child.get_weight_seen() for child in ht._tree_root._children.values()] == weights
+
+
+def test_binary_branches_of_non_integer_values():
+    ht = nominal_tree(binary_split=True)
+    value = ht._tree_root._split_test._att_value
+    X = np.array([[value, 0.5], [value + 0.5, 0.5], [value + 1.0, 0.5], [np.nan, 0.5]])
+    np.testing.assert_array_equal(ht._tree_root.instance_child_indices(X), [0, 0, 1, 1])
@@ -0,0 +1,40 @@
+import numpy as np
+
+from skmultiflow.trees import HoeffdingTree
+
+from hatt import HATT
+
+
+def threshold_stream():
+    random_state = np.random.RandomState(0)
+    X = random_state.rand(400, 3)
+    y = (X[:, 0] > 0.5).astype(int)
+    # the first instance is of the second class
+    X[0, 0], y[0] = 0.9, 1
+    return X, y
+
+
+def test_columns_follow_label_values():
+    X, y = threshold_stream()
+    ht = HATT(leaf_prediction='mc').partial_fit(X, y)
+    assert ht._class_labels == [1, 0]
+    reference = HoeffdingTree(leaf_prediction='mc').partial_fit(X, y)
+    np.testing.assert_allclose(ht.predict_proba(X), reference.predict_proba(X))
+    np.testing.assert_array_equal(ht.predict(X), reference.predict(X))
+
+
+def test_columns_of_unobserved_labels_are_empty():
+    X, y = threshold_stream()
+    ht = HATT(leaf_prediction='mc').partial_fit(X, 3 * y + 2)
+    y_proba = ht.predict_proba(X)
+    assert y_proba.shape == (len(X), 6)
+    assert not y_proba[:, [0, 1, 3, 4]].any()
+    assert set(ht.predict(X)) == {2, 5}
+
+
+def test_other_labels_are_sorted():
+    X, y = threshold_stream()
+    ht = HATT(leaf_prediction='mc').partial_fit(X, np.where(y == 1, 'b', 'a'))
+    assert ht._class_labels == ['b', 'a']
+    np.testing.assert_allclose(ht.predict_proba(X), HATT(leaf_prediction='mc').partial_fit(X, y).predict_proba(X))
+    assert ht.predict(X[:1])[0] == 'b'
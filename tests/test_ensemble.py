@@ -0,0 +1,60 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from skmultiflow.data import AGRAWALGenerator
+
+from ensemble import ParallelOzaBagging
+
+
+def agrawal_stream(num_samples):
+    stream = AGRAWALGenerator(random_state=1)
+    stream.prepare_for_use()
+    return stream.next_sample(num_samples)
+
+
+def test_fit_predict_close():
+    X, y = agrawal_stream(2000)
+    ensemble = ParallelOzaBagging(n_estimators=2, random_state=1)
+    try:
+        ensemble.partial_fit(X[:1000], y[:1000], classes=[0, 1])
+        ensemble.partial_fit(X[1000:], y[1000:])
+        y_proba = ensemble.predict_proba(X)
+        assert y_proba.shape == (len(X), 2)
+        np.testing.assert_allclose(y_proba.sum(axis=1), 1.0)
+        assert np.mean(ensemble.predict(X) == y) > 0.8
+        name = ensemble._shared_memory.name
+    finally:
+        ensemble.close()
+    assert ensemble._members is None
+    assert ensemble._shared_memory is None
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name)
+
+
+def test_columns_follow_label_values():
+    X, y = agrawal_stream(1000)
+    # the first label is the largest, and the columns of the labels 1 and 2 are left empty
+    y = 3 * y
+    y[0] = 3
+    with ParallelOzaBagging(n_estimators=2, random_state=1) as ensemble:
+        ensemble.partial_fit(X, y)
+        assert ensemble._class_labels == [3, 0]
+        y_proba = ensemble.predict_proba(X)
+        assert y_proba.shape == (len(X), 4)
+        assert not y_proba[:, 1:3].any()
+        np.testing.assert_array_equal(ensemble.predict(X), np.where(y_proba[:, 3] > y_proba[:, 0], 3, 0))
+        assert np.mean(ensemble.predict(X) == y) > 0.8
+
+
+def test_other_labels_are_sorted():
+    X, y = agrawal_stream(1000)
+    labels = np.where(y == 1, 'b', 'a')
+    labels[0] = 'b'
+    with ParallelOzaBagging(n_estimators=2, random_state=1) as ensemble:
+        ensemble.partial_fit(X, labels)
+        assert ensemble._class_labels == ['b', 'a']
+        y_proba = ensemble.predict_proba(X)
+        np.testing.assert_array_equal(ensemble.predict(X), np.where(y_proba[:, 1] > y_proba[:, 0], 'b', 'a'))
+        assert np.mean(ensemble.predict(X) == labels) > 0.8
@@ -0,0 +1,55 @@
+from skmultiflow.data import AGRAWALGenerator, RandomTreeGenerator, SEAGenerator
+
+from hatt import HATT
+
+
+def random_tree_stream():
+    stream = RandomTreeGenerator(tree_random_state=0, sample_random_state=0)
+    stream.prepare_for_use()
+    return stream
+
+
+def test_internal_nodes_are_stripped_before_leaves():
+    stream = random_tree_stream()
+    ht = HATT(max_byte_size=300000, memory_estimate_period=2000)
+    for _ in range(60):
+        X, y = stream.next_sample(500)
+        ht.partial_fit(X, y, classes=stream.target_values)
+    nodes = [found.node for found in ht._find_nodes()]
+    active_leaves = [node for node in nodes if isinstance(node, ht.HattActiveLearningNode)]
+    inactive_leaves = [node for node in nodes if isinstance(node, ht.HattInactiveLearningNode)]
+    internal_with_observers = [node for node in nodes if isinstance(node, ht.HattSplitNode)
+                               and isinstance(node.learning_node, ht.ActiveLearningNode)]
+    assert inactive_leaves
+    assert active_leaves
+    assert not internal_with_observers
+
+
+def test_lazy_statistics_do_not_use_more_memory():
+    byte_sizes = []
+    for lazy_internal_statistics in (False, True):
+        stream = AGRAWALGenerator(random_state=1)
+        stream.prepare_for_use()
+        X, y = stream.next_sample(20000)
+        ht = HATT(grace_period=100, lazy_internal_statistics=lazy_internal_statistics)
+        ht.partial_fit(X, y, classes=stream.target_values)
+        byte_sizes.append(ht.measure_byte_size())
+    eager_byte_size, lazy_byte_size = byte_sizes
+    assert lazy_byte_size <= eager_byte_size
+
+
+def test_idle_leaves_do_not_stop_growth():
+    stream = SEAGenerator(random_state=1, noise_percentage=0.1)
+    stream.prepare_for_use()
+    X, y = stream.next_sample(40000)
+    ht = HATT(idle_horizon=1000, stop_mem_management=True)
+    ht.partial_fit(X[:10000], y[:10000], classes=stream.target_values)
+    # only the left branch of the root is reached from now on, the right one goes idle
+    split_test = ht._tree_root._split_test
+    left = X[10000:, split_test.get_atts_test_depends_on()[0]] < split_test.get_split_value()
+    splits = ht.number_of_splits
+    ht.partial_fit(X[10000:][left], y[10000:][left])
+    assert ht.collapsed_nodes > 0
+    assert ht.measure_byte_size() < ht.max_byte_size
+    assert ht._growth_allowed
+    assert ht.number_of_splits > splits
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from criterion import VectorizedInfoGainSplitCriterion
+from observers import GaussianObserverStore, HistogramObserverStore, NominalCountObserver
+
+
+def test_multiway_distributions_follow_the_branches():
+    obs = NominalCountObserver()
+    for att_val, class_val, weight in ((7, 0, 4.0), (1, 1, 2.0), (3, 0, 1.0), (3, 1, 3.0)):
+        obs.observe_attribute_class(att_val, class_val, weight)
+    suggestion = obs.get_best_evaluated_split_suggestion(VectorizedInfoGainSplitCriterion(), np.array([5.0, 5.0]),
+                                                         0, False)
+    # the multiway test routes an instance to the branch of its value
+    assert suggestion.num_splits() == 8
+    assert suggestion.split_test.branch_for_instance([7]) == 7
+    for branch in range(8):
+        expected = {1: [0.0, 2.0], 3: [1.0, 3.0], 7: [4.0, 0.0]}.get(branch, [0.0, 0.0])
+        assert list(suggestion.resulting_class_distribution_from_split(branch)) == expected
+
+
+def separable_batch():
+    random_state = np.random.RandomState(0)
+    X = random_state.rand(2000, 3)
+    y = (X[:, 1] > 0.3).astype(int)
+    return X, y, np.ones(len(X))
+
+
+def test_histogram_candidates_match_gaussian_ones():
+    X, y, weight = separable_batch()
+    pre_split_dist = np.bincount(y).astype(float)
+    criterion = VectorizedInfoGainSplitCriterion()
+    suggestions = {}
+    for store in (GaussianObserverStore([0, 1, 2]), HistogramObserverStore([0, 1, 2])):
+        store.observe_batch(X, y, weight)
+        suggestions[type(store)] = store.get_best_split_suggestions(criterion, pre_split_dist, [0, 1, 2])
+    gaussian, histogram = suggestions[GaussianObserverStore], suggestions[HistogramObserverStore]
+    for att_idx in (0, 2):
+        assert histogram[att_idx].merit == pytest.approx(gaussian[att_idx].merit, abs=0.01)
+    # bin boundaries get closer to the class boundary than the Gaussian candidates
+    assert histogram[1].merit >= gaussian[1].merit > 10 * max(histogram[0].merit, histogram[2].merit)
+    assert histogram[1].split_test.get_split_value() == pytest.approx(0.3, abs=1 / 63)
+    assert gaussian[1].split_test.get_split_value() == pytest.approx(0.3, abs=0.05)
+
+
+def test_rebinning_keeps_the_weight():
+    X, y, weight = separable_batch()
+    store = HistogramObserverStore([0, 1, 2], num_bins=8)
+    store.observe_batch(X[:1000], y[:1000], weight[:1000])
+    # the range doubles until it covers the new values
+    for x, class_idx in zip(X[1000:1100] * 100 - 50, y[1000:1100]):
+        store.observe(x, class_idx, 2.0)
+    assert store._width.min() > 1 / 7
+    expected = np.bincount(y[:1000], minlength=2) + 2.0 * np.bincount(y[1000:1100], minlength=2)
+    np.testing.assert_allclose(store._counts.sum(axis=1), np.tile(expected, (3, 1)))
+
+    other = HistogramObserverStore([0, 1, 2], num_bins=8)
+    other.observe_batch(X[1100:] * 1000, y[1100:], weight[1100:])
+    store.merge([other])
+    expected += np.bincount(y[1100:], minlength=2)
+    np.testing.assert_allclose(store._counts.sum(axis=1), np.tile(expected, (3, 1)))
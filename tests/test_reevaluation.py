@@ -0,0 +1,139 @@
+import pytest
+
+from skmultiflow.data import AGRAWALGenerator
+
+from hatt import HATT
+
+
+def agrawal_tree(num_samples, **kwargs):
+    stream = AGRAWALGenerator(random_state=1)
+    stream.prepare_for_use()
+    X, y = stream.next_sample(num_samples)
+    return HATT(**kwargs).partial_fit(X, y, classes=stream.target_values)
+
+
+def split_nodes(ht):
+    return [found.node for found in ht._find_nodes() if isinstance(found.node, ht.HattSplitNode)]
+
+
+def test_reevaluation_wait_is_capped():
+    ht = agrawal_tree(20000, grace_period=100)
+    nodes = split_nodes(ht)
+    assert nodes
+    for node in nodes:
+        ht._schedule_re_evaluation(node, 1.0, 0.0)
+        assert node._next_reevaluation_weight - node.get_weight_seen() <= 10 * ht.grace_period
+    # without the cap, the root would wait as much weight as it has seen
+    root = ht._tree_root
+    assert root.get_weight_seen() > 10 * ht.grace_period
+    assert root._next_reevaluation_weight - root.get_weight_seen() == 10 * ht.grace_period
+
+
+def test_max_reevaluation_period():
+    ht = agrawal_tree(20000, grace_period=100, max_reevaluation_period=300)
+    for node in split_nodes(ht):
+        ht._schedule_re_evaluation(node, 1.0, 0.0)
+        assert node._next_reevaluation_weight - node.get_weight_seen() <= 300
+
+
+def agrawal_batch(num_samples):
+    stream = AGRAWALGenerator(random_state=2)
+    stream.prepare_for_use()
+    return stream.next_sample(num_samples)
+
+
+def queue_all_split_nodes(ht, X, y):
+    """ Make every split node due, and route a batch through the tree with all re-evaluations deferred. """
+    for node in split_nodes(ht):
+        node.set_next_reevaluation_weight(0.0)
+    ht.reevaluation_time_budget = 0
+    ht.batch_learning = True
+    ht.partial_fit(X, y)
+
+
+def test_zero_budget_defers_re_evaluations():
+    ht = agrawal_tree(20000, grace_period=100)
+    X, y = agrawal_batch(1000)
+    queue_all_split_nodes(ht, X, y)
+    assert len(ht._reevaluation_queue) == len(split_nodes(ht))
+    ht.flush()
+    assert not ht._reevaluation_queue
+
+
+def test_time_budget_bounds_each_call(monkeypatch):
+    ht = agrawal_tree(20000, grace_period=100)
+    X, y = agrawal_batch(1000)
+    queue_all_split_nodes(ht, X, y)
+    num_queued = len(ht._reevaluation_queue)
+    assert num_queued >= 4
+
+    # each re-evaluation takes one second of a fake clock
+    clock = [0.0]
+    re_evaluate = ht._re_evaluate_best_split
+
+    def timed_re_evaluation(*args):
+        clock[0] += 1.0
+        return re_evaluate(*args)
+
+    monkeypatch.setattr(ht, '_re_evaluate_best_split', timed_re_evaluation)
+    monkeypatch.setattr('hatt.time.perf_counter', lambda: clock[0])
+    ht.reevaluation_time_budget = 2.5
+    ht.batch_learning = False
+    ht.partial_fit(X[:1], y[:1])
+    # the last re-evaluation starts before the deadline, and may end after it
+    assert clock[0] == 3.0
+    assert len(ht._reevaluation_queue) == num_queued - 3
+
+
+def misplace_root_threshold(ht):
+    """ Move the threshold of the root past every value of its attribute, and make its re-evaluation due. """
+    root = ht._tree_root
+    root._split_test._att_value = 1e12
+    root.set_next_reevaluation_weight(0.0)
+    return root
+
+
+def test_installed_threshold_is_compared():
+    ht = agrawal_tree(20000, grace_period=100)
+    root = misplace_root_threshold(ht)
+    att_idx = root._split_test.get_atts_test_depends_on()[0]
+    resplits = ht.number_of_resplits
+    assert ht._re_evaluate_best_split(root, None, -1)
+    assert ht.number_of_resplits == resplits + 1
+    assert ht._tree_root._split_test.get_split_value() < 1e12
+    assert ht._tree_root._split_test.get_atts_test_depends_on()[0] == att_idx
+
+
+def test_hysteresis_applies_to_a_new_threshold():
+    ht = agrawal_tree(20000, grace_period=100, resplit_hysteresis=True)
+    root = misplace_root_threshold(ht)
+    learning_node = root.learning_node
+    best_suggestion = learning_node.select_split_suggestions(ht._criterion, ht)[0]
+    installed = learning_node.evaluate_split_test(ht._criterion, root._split_test)
+    # the installed threshold separates nothing, so no margin keeps it
+    assert installed.merit < best_suggestion.merit
+    ht.tie_threshold = float('inf')
+    assert not ht._re_evaluate_best_split(root, None, -1)
+    assert ht._tree_root is root
+    assert ht.number_of_rebuilds_avoided == 1
+
+
+@pytest.mark.parametrize('subspace', [0, -1, 2.5, [3, 0], [], 'all'])
+def test_invalid_reevaluation_subspace(subspace):
+    with pytest.raises(ValueError):
+        HATT(reevaluation_subspace=subspace)
+
+
+def test_reevaluation_subspace_larger_than_instances():
+    with pytest.raises(ValueError):
+        agrawal_tree(10, reevaluation_subspace=10)
+
+
+@pytest.mark.parametrize('sampling', ['random', 'rotating'])
+def test_reevaluation_subspace_fraction(sampling):
+    ht = agrawal_tree(20000, grace_period=100, reevaluation_subspace=0.3, reevaluation_subspace_sampling=sampling)
+    node = split_nodes(ht)[0]
+    attributes = ht._reevaluation_attributes(node, node.learning_node)
+    # 3 of the 9 attributes of AGRAWAL, the current one included
+    assert len(attributes) == 3
+    assert node._split_test.get_atts_test_depends_on()[0] in attributes
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from skmultiflow.data import AGRAWALGenerator
+
+from hatt import HATT
+from replication import TreeReplica
+
+
+def agrawal_stream(num_samples):
+    stream = AGRAWALGenerator(random_state=1)
+    stream.prepare_for_use()
+    return stream.next_sample(num_samples)
+
+
+def train_and_follow(ht, replica, records, X, y, batch_size=100):
+    """ Train the primary one batch at a time, checking after each one that the replica predicts as it does. """
+    for start in range(0, len(X), batch_size):
+        ht.partial_fit(X[start:start + batch_size], y[start:start + batch_size])
+        ht._change_log.publish_updates()
+        for record in records:
+            replica.apply(record)
+        records.clear()
+        np.testing.assert_array_equal(replica.predict_proba(X), ht.predict_proba(X))
+        np.testing.assert_array_equal(replica.predict(X), ht.predict(X))
+
+
+@pytest.mark.parametrize('leaf_prediction', ['mc', 'nba'])
+def test_replica_follows_primary(leaf_prediction):
+    X, y = agrawal_stream(12000)
+    ht = HATT(grace_period=100, leaf_prediction=leaf_prediction)
+    ht.partial_fit(X[:500], y[:500], classes=[0, 1])
+    records = []
+    ht.start_change_log(records.append, leaf_update_period=300)
+    replica = TreeReplica(HATT)
+    train_and_follow(ht, replica, records, X[500:10000], y[500:10000])
+    assert ht.number_of_splits > 1
+
+    # move the threshold of the root past every value, so that its next re-evaluation replaces the whole tree
+    root = ht._tree_root
+    root._split_test._att_value = 1e12
+    root.set_next_reevaluation_weight(0.0)
+    resplits = ht.number_of_resplits
+    train_and_follow(ht, replica, records, X[10000:], y[10000:])
+    assert ht.number_of_resplits > resplits
+    assert ht._tree_root is not root
+    assert replica.tree._tree_root.node_id == ht._tree_root.node_id != root.node_id
+
+
+def test_sequence_gap_is_detected():
+    X, y = agrawal_stream(2000)
+    ht = HATT(grace_period=100).partial_fit(X[:500], y[:500], classes=[0, 1])
+    records = []
+    ht.start_change_log(records.append, leaf_update_period=None)
+    replica = TreeReplica(HATT)
+    replica.apply(records.pop())
+    ht.partial_fit(X[500:], y[500:])
+    ht._change_log.publish_updates()
+    assert len(records) > 1
+    with pytest.raises(ValueError):
+        replica.apply(records[-1])
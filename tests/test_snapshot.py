@@ -0,0 +1,100 @@
+import os
+import pickle
+import stat
+
+import numpy as np
+import pytest
+
+from skmultiflow.data import RandomTreeGenerator
+from skmultiflow.trees.nominal_attribute_multiway_test import NominalAttributeMultiwayTest
+from skmultiflow.trees.numeric_attribute_binary_test import NumericAttributeBinaryTest
+
+from hatt import HATT
+from snapshot import DELTAS_SUFFIX, PREAMBLE
+
+
+def mixed_stream(n_samples):
+    """ Instances of a random tree, with the first two attributes turned nominal. """
+    stream = RandomTreeGenerator(tree_random_state=0, sample_random_state=0)
+    stream.prepare_for_use()
+    X, y = stream.next_sample(n_samples)
+    X[:, :2] = np.floor(X[:, :2] * 4)
+    return X, y
+
+
+def split_test_types(ht):
+    return {type(found_node.node._split_test) for found_node in ht._find_nodes()
+            if isinstance(found_node.node, ht.SplitNode)}
+
+
+def train(X, y, **kwargs):
+    ht = HATT(grace_period=50, nominal_attributes=[0, 1], leaf_prediction='nba', **kwargs)
+    ht.partial_fit(X[:2000], y[:2000], classes=[0, 1])
+    assert split_test_types(ht) == {NominalAttributeMultiwayTest, NumericAttributeBinaryTest}
+    return ht
+
+
+def assert_same_learning(ht, loaded, X, y):
+    """ Compare the predictions of two trees, before and after training both on the same instances. """
+    np.testing.assert_array_equal(loaded.predict_proba(X), ht.predict_proba(X))
+    for i in range(2000, 3000, 10):
+        ht.partial_fit(X[i:i + 10], y[i:i + 10])
+        loaded.partial_fit(X[i:i + 10], y[i:i + 10])
+    np.testing.assert_array_equal(loaded.predict_proba(X), ht.predict_proba(X))
+    assert loaded.get_model_description() == ht.get_model_description()
+
+
+@pytest.mark.parametrize('memory_map', [True, False])
+@pytest.mark.parametrize('kwargs', [{}, {'numeric_observer': 'histogram', 'lazy_internal_statistics': True}])
+def test_round_trip(tmp_path, memory_map, kwargs):
+    X, y = mixed_stream(4000)
+    ht = train(X, y, **kwargs)
+    path = str(tmp_path / 'tree.snap')
+    ht.save(path)
+    assert_same_learning(ht, HATT.load(path, memory_map=memory_map), X, y)
+
+
+def test_round_trip_of_read_only_file(tmp_path):
+    X, y = mixed_stream(4000)
+    ht = train(X, y)
+    path = str(tmp_path / 'tree.snap')
+    ht.save(path)
+    os.chmod(path, stat.S_IRUSR)
+    loaded = HATT.load(path, memory_map=True)
+    assert_same_learning(ht, loaded, X, y)
+    # training wrote to private copies of the mapped pages
+    assert HATT.load(path, memory_map=False).get_model_description() != loaded.get_model_description()
+
+
+def test_recovery_from_truncated_delta(tmp_path):
+    X, y = mixed_stream(4000)
+    ht = HATT(grace_period=50, nominal_attributes=[0, 1], leaf_prediction='nba')
+    path = str(tmp_path / 'tree.snap')
+    for start in range(0, 2000, 500):
+        ht.partial_fit(X[start:start + 500], y[start:start + 500], classes=[0, 1])
+        ht.checkpoint(path, compaction_ratio=100.0)
+        if start == 1000:
+            reference = pickle.loads(pickle.dumps(ht))
+            deltas_size = os.path.getsize(path + DELTAS_SUFFIX)
+    # the last record loses its end, as if the process died while appending it
+    with open(path + DELTAS_SUFFIX, 'r+b') as f:
+        f.truncate(os.fstat(f.fileno()).st_size - 1)
+    assert os.path.getsize(path + DELTAS_SUFFIX) > deltas_size
+    recovered = HATT.recover(path)
+    assert recovered._checkpoint['sequence'] == 2
+    assert_same_learning(reference, recovered, X, y)
+    # checkpoints resume after the last complete record
+    recovered.checkpoint(path, compaction_ratio=100.0)
+    assert_same_learning(reference, HATT.recover(path), X, y)
+
+
+def test_other_format_versions_are_rejected(tmp_path):
+    X, y = mixed_stream(1000)
+    path = str(tmp_path / 'tree.snap')
+    HATT().partial_fit(X, y).save(path)
+    with open(path, 'r+b') as f:
+        magic, version, header_size = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        f.seek(0)
+        f.write(PREAMBLE.pack(magic, version - 1, header_size))
+    with pytest.raises(ValueError, match='format version'):
+        HATT.load(path)
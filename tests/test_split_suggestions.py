@@ -0,0 +1,62 @@
+import numpy as np
+
+from skmultiflow.data import SEAGenerator
+
+from hatt import HATT
+
+
+def sea_tree(num_samples, **kwargs):
+    stream = SEAGenerator(random_state=1, noise_percentage=0.1)
+    stream.prepare_for_use()
+    X, y = stream.next_sample(num_samples)
+    return HATT(**kwargs).partial_fit(X, y, classes=stream.target_values), stream
+
+
+def test_suggestions_are_reused_by_default():
+    ht, stream = sea_tree(5000)
+    leaf = max(ht._find_learning_nodes(), key=lambda found: found.node.get_weight_seen()).node
+    leaf.get_best_split_suggestions(ht._criterion, ht)
+    cached = dict(leaf._split_suggestion_cache)
+    X, y = stream.next_sample(int(ht.merit_cache_tolerance * leaf.get_weight_seen()))
+    leaf.learn_from_batch(X, y.astype(int), np.ones(len(X)), ht)
+    leaf.get_best_split_suggestions(ht._criterion, ht)
+    assert all(leaf._split_suggestion_cache[i] is cached[i] for i in cached)
+
+
+def test_zero_tolerance_evaluates_again():
+    ht, stream = sea_tree(5000, merit_cache_tolerance=0.0)
+    leaf = ht._find_learning_nodes()[0].node
+    leaf.get_best_split_suggestions(ht._criterion, ht)
+    cached = dict(leaf._split_suggestion_cache)
+    X, y = stream.next_sample(10)
+    leaf.learn_from_batch(X, y.astype(int), np.ones(len(X)), ht)
+    leaf.get_best_split_suggestions(ht._criterion, ht)
+    assert all(leaf._split_suggestion_cache[i] is not cached[i] for i in cached)
+
+
+def test_no_preprune_breaks_ties():
+    # SEA has two equally relevant attributes, whose suggestions never beat each other by the bound
+    ht, _ = sea_tree(20000, no_preprune=True)
+    assert ht.number_of_splits > 0
+
+
+def test_suggestions_expire_after_max_reevaluation_period():
+    ht, stream = sea_tree(5000, merit_cache_tolerance=10.0, max_reevaluation_period=300)
+    leaf = max(ht._find_learning_nodes(), key=lambda found: found.node.get_weight_seen()).node
+    leaf.get_best_split_suggestions(ht._criterion, ht)
+    cached = dict(leaf._split_suggestion_cache)
+    X, y = stream.next_sample(300)
+    leaf.learn_from_batch(X, y.astype(int), np.ones(len(X)), ht)
+    leaf.get_best_split_suggestions(ht._criterion, ht)
+    assert all(leaf._split_suggestion_cache[i] is not cached[i] for i in cached)
+
+
+def test_suggestions_are_compared_at_their_evaluated_weight():
+    ht, stream = sea_tree(5000)
+    leaf = max(ht._find_learning_nodes(), key=lambda found: found.node.get_weight_seen()).node
+    evaluated_weight = leaf.select_split_suggestions(ht._criterion, ht)[3]
+    assert evaluated_weight == leaf.get_weight_seen()
+    X, y = stream.next_sample(10)
+    leaf.learn_from_batch(X, y.astype(int), np.ones(len(X)), ht)
+    # reused suggestions carry the weight they were evaluated at
+    assert leaf.select_split_suggestions(ht._criterion, ht)[3] == evaluated_weight